@@ -1,12 +1,8 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import seaborn as sns
-from io import BytesIO
-from fpdf import FPDF
-import tempfile
-import plotly.io as pio
-import os
+
+# Moduly s pandas se načítají až s daty (viz níže) - úvodní obrazovka
+# bez dat je nepotřebuje
+from core.instrument import begin_run, measured, render_panel, set_rows, stage
 
 # Nastavení zobrazení: ikona a titul stránky
 st.set_page_config(
@@ -14,70 +10,121 @@ st.set_page_config(
     page_icon=":sparkles:",
     layout="wide"
 )
+begin_run("Dashboard")
 
 # V hlavním titulku rovněž zobrazíme ikonu
 st.title(":sparkles: Dashboard - Výjezdy do oprav")
 
-uploaded_file = st.file_uploader("Nahraj Excel report", type=["xlsx"])
-
-if uploaded_file:
-    # Načtení dat
-    df_raw = pd.read_excel(uploaded_file, sheet_name=0, header=1)
-
-    # Přejmenování sloupců
-    df = df_raw.rename(columns={
-        df_raw.columns[1]: "Datum",
-        df_raw.columns[2]: "Linie",
-        df_raw.columns[3]: "PPlatz",
-        df_raw.columns[4]: "Storort",
-        df_raw.columns[5]: "Storort Popis",
-        df_raw.columns[6]: "Fab Nr",
-        df_raw.columns[7]: "Material Nr",
-        df_raw.columns[8]: "Zarizeni",
-        df_raw.columns[9]: "Material Nr 2",
-        df_raw.columns[10]: "Material Popis",
-        df_raw.columns[11]: "Fehler",
-        df_raw.columns[12]: "Fehler Popis",
-        df_raw.columns[13]: "Komentar"
-    })
-
-    df = df.dropna(subset=["Datum"])
-    df["Datum"] = pd.to_datetime(df["Datum"])
-
-    # Uložení df do session_state (pro další stránky)
-    st.session_state["df"] = df
-
-    # ------------- POSTRANNÍ FILTRY v expandru -------------
-    st.sidebar.header("Filtry")
-    with st.sidebar.expander("Rozbalit filtry"):
-        datum_od = st.date_input("Od", df["Datum"].min().date())
-        datum_do = st.date_input("Do", df["Datum"].max().date())
-
-        linky = st.multiselect("Linky", df["Linie"].unique(), default=df["Linie"].unique())
-        # zobrazení počtu vybraných linek
-        st.metric("Počet vybraných linek", len(linky))
-
-        fehler_kod_filtr = st.multiselect("Fehler kód", df["Fehler"].dropna().unique(), default=df["Fehler"].dropna().unique())
-        zarizeni_filtr = st.multiselect("Zařízení", df["Zarizeni"].dropna().unique(), default=df["Zarizeni"].dropna().unique())
-        storort_popis_filtr = st.multiselect("Storort Bezeichnung", df["Storort Popis"].dropna().unique(), default=df["Storort Popis"].dropna().unique())
-        fehler_popis_filtr = st.multiselect("Fehler Popis", df["Fehler Popis"].dropna().unique(), default=df["Fehler Popis"].dropna().unique())
-
-    # Aplikace filtrů
-    df_filtered = df[
-        (df["Datum"].dt.date >= datum_od) &
-        (df["Datum"].dt.date <= datum_do) &
-        (df["Linie"].isin(linky)) &
-        (df["Fehler"].isin(fehler_kod_filtr)) &
-        (df["Zarizeni"].isin(zarizeni_filtr)) &
-        (df["Storort Popis"].isin(storort_popis_filtr)) &
-        (df["Fehler Popis"].isin(fehler_popis_filtr))
-    ]
 
-    # -------------------- PŘEHLED DAT --------------------
-    
+@st.fragment(run_every=1)
+def sekce_nacitani(job):
+    # Průběh načítání na pozadí; po dokončení se překreslí celý dashboard
+    if job.done:
+        st.rerun()
+    from core import figures
+    from core.cube import CubeView, cube_cells
+    fraction = job.fraction()
+    remaining = job.remaining_seconds()
+    text = f"Načteno {job.rows:,} řádků".replace(",", " ")
+    if job.sheets and job.sheets > 1:
+        text += f" (hotovo {job.read} z {job.sheets} listů)"
+    elif job.total:
+        text += f" (přečteno {job.read:,} z ~{job.total:,} řádků listu)".replace(",", " ")
+    if remaining is not None:
+        text += f", zbývá asi {remaining:.0f} s"
+    st.progress(fraction or 0.0, text=text)
+
+    partial = job.partial()
+    if partial is None or partial.empty:
+        st.info("Čekám na první načtené řádky…")
+        return
+    # Náhled z dosud načtených řádků; po dokončení se dashboard vykreslí celý
+    st.caption("Předběžné výsledky z dosud načtených řádků.")
+    preview = CubeView(cube_cells(partial))
+    col_rows, col_lines, col_from, col_to = st.columns(4)
+    col_rows.metric("Záznamů", f"{len(partial):,}".replace(",", " "))
+    col_lines.metric("Linek", int(partial["Linie"].nunique()))
+    col_from.metric("Od", str(partial["Datum"].min().date()))
+    col_to.metric("Do", str(partial["Datum"].max().date()))
+    st.plotly_chart(figures.daily_figure(preview), width="stretch")
+    st.plotly_chart(figures.linie_figure(preview), width="stretch")
+
+
+zdroj_dat = st.radio("Zdroj dat", ["Nahraný soubor", "Úložiště reportů"], horizontal=True)
+
+dataset = None
+if zdroj_dat == "Nahraný soubor":
+    uploaded_files = st.file_uploader(
+        "Nahraj Excel report",
+        type=["xlsx"],
+        accept_multiple_files=True,
+        help="Lze nahrát víc souborů (např. týdenní reporty); načtou se všechny listy s daty reportu."
+    )
+    if uploaded_files:
+        from core.ingest import open_report, report_key, start_report
+        from core.store import get_store
+
+        # Nový soubor se parsuje na pozadí; další nahrání běžící parsování
+        # uvolní (zastaví se, pokud stejný soubor nenačítá jiná relace)
+        job = start_report(uploaded_files, st.session_state.get("nacitani"))
+        st.session_state["nacitani"] = job
+        if job is not None and job.error is not None:
+            st.error(f"Soubor se nepodařilo načíst: {job.error}")
+        elif job is not None and not job.done:
+            sekce_nacitani(job)
+        else:
+            # Načtení dat (parsuje se jen poprvé, dál se bere ze sdílené paměti)
+            with stage("načtení"):
+                dataset = open_report(uploaded_files)
+    elif st.session_state.get("nacitani") is not None:
+        # Soubor byl odebrán - tato relace jeho načítání už nepotřebuje
+        st.session_state["nacitani"].release()
+        st.session_state["nacitani"] = None
+    if dataset is not None:
+        if st.button("Přidat report do úložiště"):
+            new_rows = get_store().append(
+                dataset.df,
+                source_key=report_key(uploaded_files),
+                source_name=", ".join(f.name for f in uploaded_files)
+            )
+            st.success(f"Do úložiště přidáno {new_rows} nových řádků")
+else:
+    from core.store import get_store
+
+    # Načtení zvoleného období z úložiště (bez čtení původních souborů)
+    store = get_store()
+    store_od, store_do = store.date_bounds()
+    if store_od is None:
+        st.info("Úložiště je zatím prázdné - nahraj report a přidej ho do úložiště.")
+    else:
+        col_od, col_do = st.columns(2)
+        with col_od:
+            obdobi_od = st.date_input("Načíst od", store_od, min_value=store_od, max_value=store_do)
+        with col_do:
+            obdobi_do = st.date_input("Načíst do", store_do, min_value=store_od, max_value=store_do)
+        with stage("načtení"):
+            dataset = store.open(obdobi_od, obdobi_do)
+        with st.expander("Soubory v úložišti"):
+            st.dataframe(store.sources(), width="stretch", hide_index=True)
+        if dataset.df.empty:
+            st.warning("Ve zvoleném období nejsou žádná data.")
+            dataset = None
+
+# ------------------------- SEKCE DASHBOARDU -------------------------
+# Každá sekce je fragment: změna jejích ovládacích prvků přepočítá jen ji,
+# ne celý dashboard (načtení dat, filtry a ostatní grafy).
+
+@st.fragment
+@measured("přehled")
+def sekce_prehled(df, df_filtered, signature):
     st.subheader("Přehled dat")
-    st.dataframe(df_filtered, use_container_width=True)
+    paginated_dataframe(df_filtered, "prehled", dataset=df, signature=signature)
+    download_buttons(df_filtered, "radky", "vyjezdy_filtr", dataset=df, signature=signature, key="export_prehled")
 
+
+@st.fragment
+@measured("pivot")
+def sekce_pivot(df_filtered):
     # ----- DYNAMICKÁ KONTINGENČNÍ TABULKA (ZÁKLAD) -----
     st.subheader("Kontingenční analýza (pivot)")
     possible_cols = df_filtered.columns.tolist()
@@ -88,163 +135,271 @@ if uploaded_file:
 
     func = {"count": "count", "sum": "sum", "mean": "mean"}[agg_method]
 
+    pivot_source = df_filtered
+    if func != "count":
+        pivot_source = df_filtered.assign(**{values_col: numeric_view(df_filtered[values_col])})
+
     pivot_table_dynamic = pd.pivot_table(
-        df_filtered,
+        pivot_source,
         index=index_col,
         columns=columns_col,
         values=values_col,
         aggfunc=func,
-        fill_value=0
+        fill_value=0,
+        observed=True
     )
-    st.dataframe(pivot_table_dynamic, use_container_width=True)
+    st.dataframe(pivot_table_dynamic, width="stretch")
+
 
-    # ------------------------- GRAFY -------------------------
+@measured("grafy")
+def sekce_grafy(cube_view):
+    # plotly se načítá až s první sekcí, která kreslí grafy
+    from core import figures
     st.subheader("Počet chyb dle Fehler Bezeichung")
-    fehler_counts = df_filtered["Fehler Popis"].value_counts().reset_index()
-    fehler_counts.columns = ["Fehler Popis", "Pocet"]
-    fig1 = px.bar(
-        fehler_counts.head(10),
-        x="Pocet",
-        y="Fehler Popis",
-        orientation="h",
-        title="Top 10 Fehler Popis",
-        height=400
-    )
-    st.plotly_chart(fig1, use_container_width=True)
+    st.plotly_chart(figures.fehler_popis_figure(cube_view), width="stretch")
 
     st.subheader("Počet chyb dle Fehler kódu a zařízení")
-    fehler_kod_counts = df_filtered["Fehler"].value_counts().reset_index()
-    fehler_kod_counts.columns = ["Fehler", "Pocet"]
-    pie_data = df_filtered["Zarizeni"].value_counts().reset_index()
-    pie_data.columns = ["Zarizeni", "Pocet"]
-
     col_kod, col_zar = st.columns(2)
     with col_kod:
-        fig_kod = px.pie(
-            fehler_kod_counts.head(10),
-            names="Fehler",
-            values="Pocet",
-            title="Top 10 Fehler kód",
-            height=500
-        )
-        fig_kod.update_traces(textinfo='value+percent', textposition='inside')
-        st.plotly_chart(fig_kod, use_container_width=True)
+        st.plotly_chart(figures.fehler_kod_figure(cube_view), width="stretch")
     with col_zar:
-        fig_zar = px.pie(
-            pie_data.head(5),
-            names="Zarizeni",
-            values="Pocet",
-            title="Top 5 Zařízení",
-            height=500
-        )
-        fig_zar.update_traces(textinfo='value+percent', textposition='inside')
-        st.plotly_chart(fig_zar, use_container_width=True)
+        st.plotly_chart(figures.zarizeni_figure(cube_view), width="stretch")
 
     st.subheader("Paretův graf - Storort Bezeichnung")
-    pareto_storort = df_filtered["Storort Popis"].value_counts().reset_index()
-    pareto_storort.columns = ["Storort Popis", "Pocet"]
-    pareto_storort["Kumulativní %"] = pareto_storort["Pocet"].cumsum() / pareto_storort["Pocet"].sum() * 100
-    fig_pareto_storort = px.bar(
-        pareto_storort,
-        x="Storort Popis",
-        y="Pocet",
-        title="Pareto analýza dle Storort Bezeichnung"
-    )
-    fig_pareto_storort.add_scatter(
-        x=pareto_storort["Storort Popis"],
-        y=pareto_storort["Kumulativní %"],
-        mode="lines+markers",
-        name="Kumulativní %",
-        yaxis="y2"
-    )
-    fig_pareto_storort.update_layout(
-        yaxis=dict(title="Počet"),
-        yaxis2=dict(title="Kumulativní %", overlaying="y", side="right", range=[0, 100]),
-        legend=dict(x=0.8, y=1.15),
-        height=500
-    )
-    st.plotly_chart(fig_pareto_storort, use_container_width=True)
+    st.plotly_chart(figures.storort_pareto_figure(cube_view), width="stretch")
 
     st.subheader("Počet chyb dle Storort Bezeichnung")
-    storort_counts = df_filtered["Storort Popis"].value_counts().reset_index()
-    storort_counts.columns = ["Storort Popis", "Pocet"]
-    fig1b = px.bar(
-        storort_counts.head(10),
-        x="Pocet",
-        y="Storort Popis",
-        orientation="h",
-        title="Top 10 Storort Bezeichnung",
-        height=400
-    )
-    st.plotly_chart(fig1b, use_container_width=True)
+    st.plotly_chart(figures.storort_figure(cube_view), width="stretch")
 
     st.subheader("Počet chyb v čase")
-    time_series = df_filtered.groupby(df_filtered["Datum"].dt.date).size().reset_index(name="Pocet")
-    fig2 = px.line(time_series, x="Datum", y="Pocet", title="Počet chyb v čase")
-    st.plotly_chart(fig2, use_container_width=True)
+    st.plotly_chart(figures.daily_figure(cube_view), width="stretch")
 
     # Nová sekce: agregovaný počet chyb podle Linie
     
     st.subheader("Počet chyb dle Linie")
-    linie_counts = df_filtered["Linie"].value_counts().reset_index()
-    linie_counts.columns = ["Linie", "Pocet"]
-    fig_linie = px.bar(
-        linie_counts,
-        x="Linie",
-        y="Pocet",
-        title="Počet chyb dle Linie"
-    )
-    st.plotly_chart(fig_linie, use_container_width=True)
+    st.plotly_chart(figures.linie_figure(cube_view), width="stretch")
 
+
+@st.fragment
+@measured("heatmapa")
+def sekce_heatmapa(df, cube_view, signature):
     st.subheader("Heatmapa četnosti chyb podle PPlatz a Linie")
-    pivot_table = df_filtered.pivot_table(
-        index="PPlatz",
-        columns="Linie",
-        values="Fehler",
-        aggfunc="count",
-        fill_value=0
+    count_heatmap(
+        cube_view, "PPlatz", "Linie", "heatmapa",
+        require="Fehler", dataset=df, signature=signature
     )
-    st.dataframe(pivot_table.style.background_gradient(cmap="YlOrRd"))
 
+
+@st.fragment
+@measured("export pdf")
+def sekce_pdf(df, cube_view, signature, datum_od, datum_do, n_rows):
+    # ------------------------- EXPORT DO PDF -------------------------
+    st.subheader("Export do PDF")
+    if st.button("Připravit PDF"):
+        from core import figures
+        # Heatmapa v PDF odpovídá řazení a počtu řádků zvoleným na stránce
+        pdf_figures = figures.dashboard_figures(
+            cube_view,
+            heatmap_rows=st.session_state.get("heatmapa_top", DEFAULT_TOP_N),
+            heatmap_sort=st.session_state.get("heatmapa_sort", SORT_OPTIONS[0])
+        )
+        try:
+            with st.spinner("Kreslím grafy do PDF..."):
+                pdf_bytes = dashboard_pdf(
+                    pdf_figures,
+                    "Dashboard - Výjezdy do oprav",
+                    f"Období {datum_od} - {datum_do}, {n_rows} záznamů",
+                    dataset=df,
+                    signature=signature
+                )
+            st.session_state["pdf_export"] = (signature, pdf_bytes)
+        except PdfExportError as e:
+            st.error(str(e))
+    pdf_export = st.session_state.get("pdf_export")
+    if pdf_export is not None and pdf_export[0] == signature:
+        st.download_button(
+            "Stáhnout PDF",
+            pdf_export[1],
+            file_name=f"dashboard_{datum_od}_{datum_do}.pdf",
+            mime="application/pdf"
+        )
+
+
+@st.fragment
+@measured("detail záznamu")
+def sekce_detail_zaznamu(df, view):
     # ------------------------- DETAILNÍ ZÁZNAM VYBRANÉ CHYBY -------------------------
     st.subheader("Detailní záznamy chyb")
-    selected_index = st.selectbox("Vyber řádek pro detail", df_filtered.index)
+    hledat = st.text_input(
+        "Najít záznam",
+        key="detail_hledat",
+        placeholder="slovo z komentáře nebo popisu, Fab Nr, Material Nr, PPlatz"
+    )
+    # Hledá se jen ve vyfiltrovaných řádcích; tabulka je po stránkách
+    positions = lookup_positions(df, view.positions, hledat)
+    zaznamy = df.iloc[positions][[col for col in DETAIL_COLUMNS if col in df.columns]]
+    st.caption("Klikni na řádek tabulky pro zobrazení celého záznamu.")
+    selected_index = paginated_dataframe(
+        zaznamy, "zaznamy", dataset=df, signature=(view.signature, query_terms(hledat)), selectable=True
+    )
     if selected_index is not None:
-        st.write(df_filtered.loc[selected_index])
+        zaznam = df.loc[[selected_index]].iloc[0]
+        # Hodnoty různých typů jako text v jednom sloupci
+        st.dataframe(
+            pd.DataFrame({
+                "Sloupec": zaznam.index,
+                "Hodnota": zaznam.astype(object).where(zaznam.notna(), "").astype(str).to_numpy()
+            }),
+            width="stretch",
+            hide_index=True
+        )
+
 
+def _drilldown_rows(df, view, index, groups):
+    """Řádky vybraných skupin zúžené na filtr (bez masky, když filtr nic nevyřazuje)."""
+    row_mask = None if view.df is df else view.row_mask
+    return df.iloc[index.rows(groups, row_mask)]
+
+
+@st.fragment
+@measured("detail PPlatz/Linie/Fehler")
+def sekce_pplatz_linie_fehler(df, view):
     # ------------------------- DALŠÍ FILTROVÁNÍ -------------------------------------
     st.subheader("Chyby dle PPlatz, Linie a Fehler")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        selected_pplatz = st.selectbox("Vyber PPlatz", df_filtered["PPlatz"].dropna().unique())
-    with col2:
-        selected_linie = st.selectbox("Vyber Linie", df_filtered["Linie"].dropna().unique())
-    with col3:
-        selected_fehler = st.selectbox("Vyber Fehler", df_filtered["Fehler"].dropna().unique())
-
-    filtered_detail = df_filtered[
-        (df_filtered["PPlatz"] == selected_pplatz) &
-        (df_filtered["Linie"] == selected_linie) &
-        (df_filtered["Fehler"] == selected_fehler)
-    ][["Datum", "Storort Popis", "Komentar"]]
-
-    st.dataframe(filtered_detail, use_container_width=True)
+    index = get_group_index(df, "pplatz_linie_fehler")
+    # Jen kombinace, které ve filtru existují; další výběr závisí na předchozím
+    available = index.counts(view.positions)
+    chosen = {}
+    levels = [("PPlatz", "Vyber PPlatz"), ("Linie", "Vyber Linie"), ("Fehler", "Vyber Fehler")]
+    for column, (col, label) in zip(st.columns(3), levels):
+        with column:
+            chosen[col] = level_select(label, level_options(available, chosen), key=f"detail_{col.lower()}")
+
+    groups = matching_groups(available, chosen).index
+    filtered_detail = _drilldown_rows(df, view, index, groups)[["Datum", "Storort Popis", "Komentar"]]
+
+    detail_signature = (view.signature, chosen["PPlatz"], chosen["Linie"], chosen["Fehler"])
+    paginated_dataframe(filtered_detail, "detail", dataset=df, signature=detail_signature)
+    download_buttons(
+        filtered_detail, "detail", "detail_pplatz_linie_fehler",
+        dataset=df, signature=detail_signature, key="export_detail"
+    )
 
+
+@st.fragment
+@measured("detail Linie/Storort")
+def sekce_linie_storort(df, view):
     st.subheader("Chyby dle Linie a Storort Popis")
+    index = get_group_index(df, "linie_storort")
+    available = index.counts(view.positions)
     col_linie, col_storort = st.columns(2)
     with col_linie:
-        selected_linie_storort = st.selectbox("Vyber Linie", df_filtered["Linie"].dropna().unique(), key="linie_storort")
+        selected_linie_storort = level_select("Vyber Linie", level_options(available, {}), key="linie_storort")
     with col_storort:
-        selected_stororts = st.multiselect("Vyber Storort Popis", df_filtered["Storort Popis"].dropna().unique())
+        selected_stororts = level_multiselect(
+            "Vyber Storort Popis",
+            level_options(available, {"Linie": selected_linie_storort}),
+            key="storort_vyber"
+        )
 
-    filtered_storort_detail = df_filtered[
-        (df_filtered["Linie"] == selected_linie_storort) &
-        (df_filtered["Storort Popis"].isin(selected_stororts))
-    ][["Datum", "PPlatz", "Storort Popis", "Komentar", "Fab Nr", "Material Nr", "Zarizeni"]]
+    groups = matching_groups(available, {"Linie": selected_linie_storort, "Storort Popis": selected_stororts}).index
+    filtered_storort_detail = _drilldown_rows(df, view, index, groups)[
+        ["Datum", "PPlatz", "Storort Popis", "Komentar", "Fab Nr", "Material Nr", "Zarizeni"]
+    ]
 
-    st.dataframe(filtered_storort_detail, use_container_width=True)
+    storort_signature = (view.signature, selected_linie_storort, tuple(selected_stororts))
+    paginated_dataframe(filtered_storort_detail, "storort_detail", dataset=df, signature=storort_signature)
+    download_buttons(
+        filtered_storort_detail, "storort_detail", "detail_linie_storort",
+        dataset=df, signature=storort_signature, key="export_storort"
+    )
+
+
+if dataset is not None:
+    # Moduly pro analýzu; sekce výše je najdou při volání
+    import pandas as pd
+
+    from core.aggregate import numeric_view
+    from core.cube import chart_view
+    from core.drilldown import (
+        DETAIL_COLUMNS, get_group_index, level_multiselect, level_options, level_select, lookup_positions,
+        matching_groups
+    )
+    from core.export import download_buttons
+    from core.filter_state import filter_panel, filtered_view
+    from core.grid import paginated_dataframe
+    from core.heatmap import DEFAULT_TOP_N, SORT_OPTIONS, count_heatmap
+    from core.pdf_export import PdfExportError, dashboard_pdf
+    from core.registry import get_registry
+    from core.schema import memory_report
+    from core.search import query_terms
+
+    # Relace drží jen handle na sdílený dataset (pro další stránky)
+    st.session_state["dataset"] = dataset
+    df = dataset.df
+    set_rows(len(df))
+
+    # Přehled paměti se počítá, jen když je expander otevřený
+    pamet = st.sidebar.expander("Paměť dat", key="pamet_dat", on_change="rerun")
+    if pamet.open:
+        with pamet:
+            mem = memory_report(df)
+            st.metric("Celkem (MB)", f"{mem['MB'].sum():.1f}")
+            st.dataframe(mem, width="stretch", hide_index=True)
+            registry = get_registry()
+            st.caption(
+                f"Datasety v paměti serveru: {registry.resident_mb():.1f} MB "
+                f"z {registry.budget_bytes / 1024 / 1024:.0f} MB"
+            )
+            st.dataframe(registry.resident(), width="stretch", hide_index=True)
+
+    # ------------- POSTRANNÍ FILTRY v expandru -------------
+    st.sidebar.header("Filtry")
+    # Filtry jsou společné všem stránkám relace
+    with stage("nabídky filtrů"):
+        filtry, facet_counts = filter_panel(df)
+        # zobrazení počtu vybraných linek
+        linky = filtry["selections"]["Linie"]
+        st.sidebar.metric("Počet vybraných linek", len(linky) if linky else int((facet_counts["Linie"] > 0).sum()))
+
+    # Aplikace filtrů (stejné filtry na jiné stránce vrací hotový výsledek)
+    with stage("filtr"):
+        view = filtered_view(df, filtry)
+        df_filtered = view.df
+        signature = view.signature
+        datum_od, datum_do, selections = view.date_from, view.date_to, view.selections
+
+    # Grafy se počítají z předagregované kostky, pokud komprimuje a filtr
+    # je jen přes její dimenze; jinak přímo z vyfiltrovaných řádků
+    with stage("kostka"):
+        cube_view = chart_view(df, view)
+
+    # Záložky se počítají líně - vykresluje se jen ta otevřená
+    tab_prehled, tab_pivot, tab_grafy, tab_detail = st.tabs(
+        ["Přehled dat", "Kontingenční tabulka", "Grafy", "Detailní záznamy"],
+        key="dashboard_tab",
+        on_change="rerun"
+    )
+    if tab_prehled.open:
+        with tab_prehled:
+            sekce_prehled(df, df_filtered, signature)
+    if tab_pivot.open:
+        with tab_pivot:
+            sekce_pivot(df_filtered)
+    if tab_grafy.open:
+        with tab_grafy:
+            sekce_grafy(cube_view)
+            sekce_heatmapa(df, cube_view, signature)
+            sekce_pdf(df, cube_view, signature, datum_od, datum_do, len(df_filtered))
+    if tab_detail.open:
+        with tab_detail:
+            sekce_detail_zaznamu(df, view)
+            sekce_pplatz_linie_fehler(df, view)
+            sekce_linie_storort(df, view)
 
     st.success("Analýza úspěšně provedena")
 
-else:
+elif zdroj_dat == "Nahraný soubor" and not uploaded_files:
     st.info("Nahraj Excel soubor pro zobrazení analýzy.")
+
+render_panel()
@@ -0,0 +1,3 @@
+"""
+Výkonnostní benchmarky zpracování reportu (viz `benchmarks.run`).
+"""
@@ -0,0 +1,129 @@
+"""
+Generátor syntetických Excel reportů ve stejném formátu, jaký čte dashboard:
+první řádek je titulek, hlavička je na druhém řádku a za nepojmenovaným
+sloupcem následuje 13 sloupců Datum ... Komentar (`core.schema.COLUMN_NAMES`).
+
+    python -m benchmarks.generate 100000 report_100k.xlsx
+
+Kardinality odpovídají reálným reportům (desítky linek, stovky až tisíce
+PPlatz, stovky Storort, desítky kódů Fehler s vlastním popisem) a data jsou
+deterministická podle `seed`.
+"""
+import argparse
+import os
+import shutil
+import zipfile
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+from core.schema import COLUMN_NAMES
+
+N_LINES = 24
+N_PPLATZ = 1500
+N_STORORT = 250
+N_FEHLER = 90
+N_ZARIZENI = 60
+N_MATERIAL = 800
+
+COMMENTS = [
+    "Leck am Ventil", "Sensor defekt", "výměna čidla", "Kabel beschädigt", "seřízení dorazu",
+    "Schraube lose", "čištění trysky", "Software-Update", "výměna těsnění", "Druckabfall",
+]
+
+# Podíl řádků s prázdným komentářem / chybějícím kódem chyby
+EMPTY_COMMENT_RATIO = 0.3
+EMPTY_FEHLER_RATIO = 0.02
+
+
+def _skewed(rng, n_values, size):
+    """Indexy hodnot s Zipfovým rozdělením (několik častých, dlouhý chvost)."""
+    weights = 1.0 / np.arange(1, n_values + 1)
+    return rng.choice(n_values, size=size, p=weights / weights.sum())
+
+
+def synthetic_report(n_rows, seed=0, start="2024-01-01", days=365):
+    """Syntetický report jako DataFrame se sloupci COLUMN_NAMES."""
+    rng = np.random.default_rng(seed)
+    minutes = np.sort(rng.integers(0, days * 24 * 60, n_rows))
+    datum = pd.Timestamp(start) + pd.to_timedelta(minutes, unit="min")
+
+    pplatz = _skewed(rng, N_PPLATZ, n_rows)
+    storort = _skewed(rng, N_STORORT, n_rows)
+    fehler = _skewed(rng, N_FEHLER, n_rows)
+    material = _skewed(rng, N_MATERIAL, n_rows)
+    comments = np.array(COMMENTS, dtype=object)[rng.integers(0, len(COMMENTS), n_rows)]
+    comments[rng.random(n_rows) < EMPTY_COMMENT_RATIO] = None
+    fehler_codes = (100 + fehler).astype(object)
+    fehler_popis = np.array([f"Chyba {c} - závada č. {c % 17}" for c in range(100, 100 + N_FEHLER)], dtype=object)[fehler]
+    missing = rng.random(n_rows) < EMPTY_FEHLER_RATIO
+    fehler_codes[missing] = None
+    fehler_popis[missing] = None
+
+    return pd.DataFrame({
+        "Datum": datum,
+        "Linie": np.array([f"L{i:02d}" for i in range(N_LINES)])[_skewed(rng, N_LINES, n_rows)],
+        "PPlatz": 1000 + pplatz,
+        "Storort": 5000 + storort,
+        "Storort Popis": np.array([f"Sklad {i} - regál {i % 12}" for i in range(N_STORORT)])[storort],
+        "Fab Nr": rng.integers(100000, 999999, n_rows),
+        "Material Nr": 4000000 + material,
+        "Zarizeni": np.array([f"Zařízení {i:02d}" for i in range(N_ZARIZENI)])[_skewed(rng, N_ZARIZENI, n_rows)],
+        "Material Nr 2": 4000000 + material,
+        "Material Popis": np.array([f"Díl {i} ({'senzor' if i % 3 else 'ventil'})" for i in range(N_MATERIAL)])[material],
+        "Fehler": fehler_codes,
+        "Fehler Popis": fehler_popis,
+        "Komentar": comments,
+    }, columns=COLUMN_NAMES)
+
+
+def _add_dimension(path, ref):
+    """
+    Doplní do listu značku <dimension> (write-only režim ji nezapisuje).
+
+    Excel ji zapisuje vždy; bez ní openpyxl v read-only režimu projde při
+    otevření celý list navíc, takže by benchmark načítání nadhodnotil.
+    """
+    sheet = "xl/worksheets/sheet1.xml"
+    tmp_path = path + ".dim"
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            with src.open(item) as f_in, dst.open(item.filename, "w") as f_out:
+                if item.filename == sheet:
+                    head = f_in.read(4096)
+                    head = head.replace(b"</sheetPr>", f'</sheetPr><dimension ref="{ref}"/>'.encode(), 1)
+                    f_out.write(head)
+                shutil.copyfileobj(f_in, f_out)
+    os.replace(tmp_path, path)
+
+
+def write_report(df, path):
+    """
+    Zapíše report do xlsx v rozložení reportu (titulek, hlavička na 2. řádku,
+    nepojmenovaný první sloupec s pořadovým číslem). Používá write-only
+    režim openpyxl, aby šlo zapsat i milion řádků.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Report")
+    ws.append(["Report výjezdů do oprav"])
+    ws.append([None] + COLUMN_NAMES)
+    columns = [df[col].astype(object).where(df[col].notna(), None).tolist() for col in COLUMN_NAMES]
+    for i, row in enumerate(zip(*columns), start=1):
+        ws.append([i] + [v.to_pydatetime() if isinstance(v, pd.Timestamp) else v for v in row])
+    wb.save(path)
+    _add_dimension(path, f"A1:{get_column_letter(len(COLUMN_NAMES) + 1)}{len(df) + 2}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vygeneruje syntetický Excel report.")
+    parser.add_argument("rows", type=int, help="počet řádků")
+    parser.add_argument("output", help="cílový soubor .xlsx")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    write_report(synthetic_report(args.rows, seed=args.seed), args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Benchmark jednotlivých fází zpracování reportu.
+
+    python -m benchmarks.run --rows 10000 100000 --output vysledky.json
+    python -m benchmarks.run --rows 10000 100000 --baseline baseline.json
+
+Pro každou velikost se vygeneruje (nebo znovu použije) syntetický report
+(`benchmarks.generate`) a změří se zvlášť: načtení, stavba indexů,
+filtrování, kontingenční tabulka bez a se součtovým řádkem, agregace
+pro jednotlivé grafy, stavba denního indexu a srovnání období na stránce
+KPI. U každé fáze se zapíše nejlepší čas z `--repeat` opakování a špička
+alokované paměti (tracemalloc, měřeno v samostatném běhu). U kostky se
+zapíše i počet buněk na řádek (`cell_ratio`) a zda ji dashboard použije;
+použitá kostka s víc než MAX_CELL_RATIO buňkami na řádek je chyba
+(návratový kód 1).
+
+S `--baseline` se výsledky porovnají s dřívějším JSON a fáze, které jsou
+pomalejší o víc než `--tolerance`, se vypíšou jako regrese (návratový
+kód 1).
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate import synthetic_report, write_report
+from core.cube import MAX_CELL_RATIO, CountCube, CubeView
+from core.filters import FilterIndex
+from core.ingest import read_report
+from core.pivot import compute_pivot, with_margins
+from core.schema import compact_frame
+from core.timeline import DailyIndex, comparison_period
+
+SIZES = [10_000, 100_000, 1_000_000]
+
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.2
+
+# Rozdíly pod touto hranicí (s) se za regresi nepovažují - jde o šum
+MIN_REGRESSION_SECONDS = 0.005
+
+# Délka období pro srovnání KPI
+KPI_DAYS = 30
+
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "excel_analyze_bench")
+
+
+def report_path(rows, seed=0, data_dir=DEFAULT_DATA_DIR):
+    """Cesta k syntetickému reportu; vygeneruje ho, pokud ještě neexistuje."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"report_{rows}_seed{seed}.xlsx")
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        write_report(synthetic_report(rows, seed=seed), tmp_path)
+        os.replace(tmp_path, path)
+    return path
+
+
+def _selections(df):
+    """Typický výběr filtrů: polovina linek, všechny ostatní hodnoty."""
+    lines = df["Linie"].dropna().unique()
+    return {
+        "Linie": list(lines[: max(1, len(lines) // 2)]),
+        "Fehler": list(df["Fehler"].dropna().unique()),
+    }
+
+
+def pipeline_stages(path):
+    """
+    Fáze zpracování jako seznam dvojic (název, funkce). Funkce se volají
+    v pořadí; každá může použít výsledky předchozích přes sdílený slovník.
+    """
+    state = {}
+
+    def ingest():
+        state["df"] = compact_frame(read_report(path))
+
+    def filter_index():
+        state["index"] = FilterIndex(state["df"])
+        df = state["df"]
+        state["date_from"] = df["Datum"].min().date()
+        state["date_to"] = df["Datum"].max().date()
+        state["selections"] = _selections(df)
+
+    def filter_mask():
+        positions = state["index"].select(state["date_from"], state["date_to"], state["selections"])
+        state["df_filtered"] = state["df"].iloc[positions]
+
+    def pivot():
+        compute_pivot(state["df_filtered"], ["Linie"], ["Fehler Popis"], ["Fehler"], ["count", "sum", "mean"])
+
+    def pivot_margins():
+        with_margins(*compute_pivot(state["df_filtered"], ["Linie"], ["Fehler Popis"], ["Fehler"], ["count", "sum", "mean"]))
+
+    def cube():
+        state["cube"] = CountCube(state["df"])
+
+    def cube_filter():
+        # Stejná volba jako `core.cube.chart_view`: kostka, nebo vyfiltrované řádky
+        cube = state["cube"]
+        if cube.answers(state["selections"]):
+            state["view"] = cube.filter(
+                state["date_from"], state["date_to"], state["selections"], rows=state["df_filtered"]
+            )
+        else:
+            state["view"] = CubeView(state["df_filtered"])
+
+    def chart(name, build):
+        return (f"chart_{name}", lambda: build(state["view"]))
+
+    def daily_index():
+        state["daily_index"] = DailyIndex(state["df"])
+
+    def kpi():
+        index = state["daily_index"]
+        date_to = state["date_to"]
+        date_from = date_to - datetime.timedelta(days=KPI_DAYS - 1)
+        index.total(date_from, date_to)
+        index.total(*comparison_period(date_from, date_to, "Předchozí období"))
+        index.compare("Linie", date_from, date_to, *comparison_period(date_from, date_to, "Rok proti roku (YoY)"))
+        index.counts("Fehler", date_from, date_to)
+        index.daily(date_from, date_to)
+        index.rolling(date_from, date_to, 28, "Linie")
+
+    def cube_stats():
+        cube = state["cube"]
+        return {"cell_ratio": round(cube.cell_ratio, 4), "cube_used": bool(cube.compresses)}
+
+    stages = [
+        ("ingest", ingest),
+        ("filter_index", filter_index),
+        ("filter_mask", filter_mask),
+        ("pivot", pivot),
+        ("pivot_margins", pivot_margins),
+        ("cube", cube),
+        ("cube_filter", cube_filter),
+        chart("fehler_popis", lambda view: view.counts("Fehler Popis")),
+        chart("fehler", lambda view: view.counts("Fehler")),
+        chart("zarizeni", lambda view: view.counts("Zarizeni")),
+        chart("storort_pareto", lambda view: view.counts("Storort Popis")["Pocet"].cumsum()),
+        chart("daily", lambda view: view.daily()),
+        chart("linie", lambda view: view.counts("Linie")),
+        chart("heatmap", lambda view: view.matrix("PPlatz", "Linie", require="Fehler")),
+        ("daily_index", daily_index),
+        ("kpi", kpi),
+    ]
+    return stages, cube_stats
+
+
+def _peak_rss_mb():
+    """Maximální RSS procesu v MB (Linux hlásí kB, macOS bajty)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def run_size(rows, repeat=DEFAULT_REPEAT, data_dir=DEFAULT_DATA_DIR, log=None):
+    """Změří všechny fáze pro report s `rows` řádky a vrátí {fáze: výsledky}."""
+    path = report_path(rows, data_dir=data_dir)
+    results = {}
+
+    # Časy: nejlepší z `repeat` běhů (načtení souboru jen jednou - trvá nejdéle)
+    stages, cube_stats = pipeline_stages(path)
+    for name, stage in stages:
+        times = []
+        for _ in range(1 if name == "ingest" else repeat):
+            started = time.perf_counter()
+            stage()
+            times.append(time.perf_counter() - started)
+        results[name] = {"seconds": round(min(times), 6)}
+        if log is not None:
+            log(f"{rows:>9} {name:<22} {min(times):9.4f} s")
+    results["cube"].update(cube_stats())
+    if log is not None:
+        log(f"{rows:>9} {'cube cell_ratio':<22} {results['cube']['cell_ratio']:9.4f}"
+            f" ({'použitá' if results['cube']['cube_used'] else 'nepoužitá'})")
+
+    # Paměť: samostatný běh pod tracemalloc (zpomaluje, proto se nemíchá s časy)
+    tracemalloc.start()
+    try:
+        for name, stage in pipeline_stages(path)[0]:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            stage()
+            peak = tracemalloc.get_traced_memory()[1]
+            results[name]["peak_mb"] = round((peak - before) / 1024 / 1024, 3)
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def cube_problems(current, max_ratio=MAX_CELL_RATIO):
+    """Velikosti, u kterých se používá kostka s víc než `max_ratio` buňkami na řádek."""
+    problems = []
+    for size, stages in current["results"].items():
+        cube = stages.get("cube", {})
+        if cube.get("cube_used") and cube.get("cell_ratio", 0) > max_ratio:
+            problems.append((size, cube["cell_ratio"]))
+    return problems
+
+
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Porovná výsledky s baseline a vrátí seznam regresí
+    (velikost, fáze, baseline s, aktuální s, poměr).
+    """
+    regressions = []
+    for size, stages in current["results"].items():
+        base_stages = baseline.get("results", {}).get(size, {})
+        for name, result in stages.items():
+            base = base_stages.get(name)
+            if base is None:
+                continue
+            seconds, base_seconds = result["seconds"], base["seconds"]
+            if seconds - base_seconds > MIN_REGRESSION_SECONDS and seconds > base_seconds * (1 + tolerance):
+                regressions.append((size, name, base_seconds, seconds, seconds / base_seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark fází zpracování reportu.")
+    parser.add_argument("--rows", type=int, nargs="+", default=SIZES, help="velikosti reportu (řádky)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="počet opakování každé fáze")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="adresář pro vygenerované reporty")
+    parser.add_argument("--output", help="soubor pro výsledky (JSON)")
+    parser.add_argument("--baseline", help="dřívější výsledky (JSON) pro porovnání")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="povolené zpomalení proti baseline (0.2 = 20 %%)")
+    args = parser.parse_args(argv)
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    current = {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+        },
+        "results": {},
+    }
+    for rows in args.rows:
+        current["results"][str(rows)] = run_size(rows, repeat=args.repeat, data_dir=args.data_dir, log=log)
+    current["meta"]["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+
+    text = json.dumps(current, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    status = 0
+    for size, ratio in cube_problems(current):
+        log(f"KOSTKA NEKOMPRIMUJE {size:>9} {ratio:.3f} buněk na řádek > {MAX_CELL_RATIO}")
+        status = 1
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.tolerance)
+        for size, name, base_seconds, seconds, ratio in regressions:
+            log(f"REGRESE {size:>9} {name:<22} {base_seconds:.4f} s -> {seconds:.4f} s ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        log("Bez regresí proti baseline.")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Benchmark startu aplikace: importy a první vykreslení každé stránky.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --repeat 5 --output startup.json
+    python -m benchmarks.startup --import-budget 0.5 --paint-budget 1.5
+
+Každé měření běží v novém procesu (studený start jako v čerstvém
+kontejneru). Streamlit je v procesu serveru načtený vždy, proto se jeho
+import měří zvlášť a do rozpočtu se nepočítá. Pro každou stránku se
+zapíše nejlepší čas z `--repeat` běhů:
+
+- `import_s`: provedení importů na začátku skriptu stránky (importy až
+  za načtením dat se bez dat neprovedou a patří do prvního vykreslení),
+- `first_paint_s`: první běh stránky bez dat (`streamlit.testing`) až po
+  nahrávání souboru, resp. výzvu k nahrání dat (`upload_widget` říká,
+  zda stránka nahrávání nabízí).
+
+Stránky, které překročí rozpočet (STARTUP_BUDGET), se vypíšou
+(návratový kód 1).
+"""
+import argparse
+import ast
+import datetime
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_REPEAT = 3
+
+# Rozpočet studeného startu jedné stránky (s)
+STARTUP_BUDGET = {"import_s": 1.0, "first_paint_s": 2.5}
+
+
+def app_pages(root=ROOT):
+    """Hlavní skript a stránky aplikace (cesty relativně k `root`)."""
+    pages = sorted(os.path.relpath(path, root) for path in glob.glob(os.path.join(root, "pages", "*.py")))
+    return ["Dashboard.py"] + pages
+
+
+def _import_source(path):
+    """Zdrojový kód importů na začátku skriptu stránky (před prvním příkazem)."""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source)
+    imports = []
+    for node in tree.body:
+        if not isinstance(node, (ast.Import, ast.ImportFrom)):
+            break
+        imports.append(node)
+    return ast.unparse(ast.Module(body=imports, type_ignores=[]))
+
+
+def measure_imports(page):
+    """Čas importů stránky (v tomto procesu, po načtení Streamlitu)."""
+    started = time.perf_counter()
+    import streamlit  # noqa: F401
+    streamlit_s = time.perf_counter() - started
+
+    code = compile(_import_source(os.path.join(ROOT, page)), page, "exec")
+    started = time.perf_counter()
+    exec(code, {"__name__": "__startup__"})
+    return {"streamlit_s": streamlit_s, "import_s": time.perf_counter() - started}
+
+
+def measure_first_paint(page):
+    """Čas prvního běhu stránky bez dat (v tomto procesu, po načtení Streamlitu)."""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=120)
+    started = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - started
+    if at.exception:
+        raise RuntimeError(f"{page}: {at.exception[0].value}")
+    return {"first_paint_s": elapsed, "upload_widget": len(at.get("file_uploader")) > 0}
+
+
+def _measure_fresh(page, what):
+    """Spustí měření `what` stránky v novém procesu Pythonu a vrátí jeho výsledek."""
+    completed = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--measure", what, page],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=False
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{page} ({what}): {completed.stderr.strip()[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_page(page, repeat=DEFAULT_REPEAT, log=None):
+    """Nejlepší časy studeného startu stránky z `repeat` běhů."""
+    result = {}
+    for what in ("imports", "first_paint"):
+        runs = [_measure_fresh(page, what) for _ in range(repeat)]
+        for name in runs[0]:
+            values = [run[name] for run in runs]
+            result[name] = round(min(values), 6) if isinstance(values[0], float) else values[0]
+    if log is not None:
+        log(f"{page:<40} import {result['import_s']:7.3f} s  první vykreslení {result['first_paint_s']:7.3f} s")
+    return result
+
+
+def over_budget(results, budget=STARTUP_BUDGET):
+    """Překročení rozpočtu jako seznam (stránka, měření, čas, rozpočet)."""
+    exceeded = []
+    for page, result in results.items():
+        for name, limit in budget.items():
+            if result[name] > limit:
+                exceeded.append((page, name, result[name], limit))
+    return exceeded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark studeného startu stránek aplikace.")
+    parser.add_argument("--pages", nargs="+", help="stránky relativně ke kořeni repozitáře (výchozí všechny)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="počet běhů každého měření")
+    parser.add_argument("--import-budget", type=float, default=STARTUP_BUDGET["import_s"],
+                        help="rozpočet importů stránky (s)")
+    parser.add_argument("--paint-budget", type=float, default=STARTUP_BUDGET["first_paint_s"],
+                        help="rozpočet prvního vykreslení stránky (s)")
+    parser.add_argument("--output", help="soubor pro výsledky (JSON)")
+    parser.add_argument("--measure", nargs=2, metavar=("CO", "STRÁNKA"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        # Jedno měření v novém procesu (volá `_measure_fresh`)
+        what, page = args.measure
+        measure = measure_imports if what == "imports" else measure_first_paint
+        print(json.dumps(measure(page)))
+        return 0
+
+    def log(message):
+        print(message, file=sys.stderr)
+
+    budget = {"import_s": args.import_budget, "first_paint_s": args.paint_budget}
+    current = {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+            "budget": budget,
+        },
+        "results": {},
+    }
+    for page in args.pages or app_pages():
+        current["results"][page] = run_page(page, repeat=args.repeat, log=log)
+
+    text = json.dumps(current, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    exceeded = over_budget(current["results"], budget)
+    for page, name, seconds, limit in exceeded:
+        log(f"NAD ROZPOČET {page:<40} {name:<14} {seconds:.3f} s > {limit:.3f} s")
+    if exceeded:
+        return 1
+    log("Všechny stránky v rozpočtu.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""
+Sdílená logika dashboardu výjezdů do oprav (načítání, cache, výpočty).
+
+Moduly v tomto balíčku nesmí záviset na konkrétní stránce, aby je mohl
+používat `Dashboard.py` i všechny stránky v `pages/`.
+"""
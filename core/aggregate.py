@@ -0,0 +1,21 @@
+"""
+Agregace pro grafy a KPI.
+"""
+import pandas as pd
+
+
+def numeric_view(series):
+    """
+    Číselná podoba sloupce pro sum/mean v pivotech.
+
+    Categorical sloupce s číselnými kategoriemi (např. kód Fehler) se
+    převedou zpět na čísla, ostatní sloupce se vrátí beze změny.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series
+    categories = series.cat.categories
+    if not pd.api.types.is_numeric_dtype(categories):
+        return series
+    if series.isna().any():
+        return series.astype("float64")
+    return series.astype(categories.dtype)
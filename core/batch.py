@@ -0,0 +1,204 @@
+"""
+Dávkové zpracování adresáře reportů bez prohlížeče.
+
+    python -m core.batch <adresář s reporty> <výstupní adresář> [--format csv] [--pdf]
+
+Každý soubor se parsuje v samostatném procesu (stejné mapování sloupců
+a čištění `Datum` jako na dashboardu; listy sešitu postupně v témže
+procesu, bez dalšího poolu) a do hlavního procesu se vrací jen buňky
+denní kostky počtů (`core.cube.cube_cells`). Z jejich součtu se
+počítají agregace dashboardu a KPI a zapisují se jako Parquet nebo CSV.
+"""
+import argparse
+import datetime
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from core import figures
+from core.cube import CubeView, cube_cells, merge_cells
+from core.ingest import load_report_file
+from core.pdf_export import PdfExportError, dashboard_pdf
+from core.schema import DATE_COLUMN
+
+FORMATS = ["parquet", "csv"]
+
+# Délka období pro KPI (posledních N dní proti předchozím N dnům)
+DEFAULT_KPI_DAYS = 7
+
+
+def summarize_file(path):
+    """
+    Zparsuje jeden report a vrátí slovník s přehledem souboru a buňkami
+    kostky. Chyba souboru se vrátí v klíči "chyba" (dávka pokračuje).
+    """
+    started = time.perf_counter()
+    summary = {"soubor": os.path.basename(path), "radku": 0, "od": None, "do": None, "chyba": None}
+    try:
+        df = load_report_file(path, parallel=False)
+    except Exception as e:
+        summary["chyba"] = f"{type(e).__name__}: {e}"
+        summary["cells"] = None
+    else:
+        summary["radku"] = len(df)
+        if len(df):
+            summary["od"] = df["Datum"].min()
+            summary["do"] = df["Datum"].max()
+        summary["cells"] = cube_cells(df)
+    summary["sekund"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def process_reports(paths, workers=None, progress=None):
+    """
+    Zpracuje soubory paralelně a vrátí (přehled souborů, sloučené buňky kostky).
+
+    `progress(hotovo, celkem, přehled)` se volá po dokončení každého souboru.
+    """
+    workers = workers or os.cpu_count() or 1
+    summaries = []
+
+    def collect(summary):
+        summaries.append(summary)
+        if progress is not None:
+            progress(len(summaries), len(paths), summary)
+
+    if workers == 1:
+        for path in paths:
+            collect(summarize_file(path))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for future in as_completed([pool.submit(summarize_file, path) for path in paths]):
+                collect(future.result())
+
+    parts = [s.pop("cells") for s in summaries]
+    parts = [cells for cells in parts if cells is not None and len(cells)]
+    files = pd.DataFrame(summaries).sort_values("soubor", ignore_index=True)
+    if not parts:
+        return files, None
+    return files, merge_cells(parts)
+
+
+def kpi_table(view, days=DEFAULT_KPI_DAYS):
+    """
+    KPI za posledních `days` dní dat proti stejně dlouhému předchozímu
+    období (jako stránka KPI).
+    """
+    cells = view.cells
+    last_day = cells[DATE_COLUMN].max()
+    start = last_day - pd.Timedelta(days=days - 1)
+    prev_start = start - pd.Timedelta(days=days)
+    current = CubeView(cells[cells[DATE_COLUMN] >= start])
+    previous = CubeView(cells[(cells[DATE_COLUMN] >= prev_start) & (cells[DATE_COLUMN] < start)])
+
+    total = current.total()
+    prev_total = previous.total()
+    line_counts = current.counts("Linie")
+    return pd.DataFrame([{
+        "od": start.date(),
+        "do": last_day.date(),
+        "pocet": total,
+        "pocet_predchozi": prev_total,
+        "rozdil": total - prev_total,
+        "rozdil_pct": (total - prev_total) / prev_total * 100 if prev_total else None,
+        "prumer_na_den": total / days,
+        "top_linie": str(line_counts.iloc[0, 0]) if len(line_counts) else None,
+        "top_linie_pocet": int(line_counts.iloc[0, 1]) if len(line_counts) else 0,
+        "prumer_na_linku": line_counts["Pocet"].mean() if len(line_counts) else 0,
+    }])
+
+
+def aggregate_tables(view, kpi_days=DEFAULT_KPI_DAYS):
+    """Agregace dashboardu jako slovník {název výstupu: DataFrame}."""
+    return {
+        "linie": view.counts("Linie"),
+        "fehler": view.counts("Fehler"),
+        "fehler_popis": view.counts("Fehler Popis"),
+        "zarizeni": view.counts("Zarizeni"),
+        "storort_pareto": figures.pareto_table(view),
+        "denni": view.daily(),
+        "kpi": kpi_table(view, kpi_days),
+    }
+
+
+def write_table(df, path_base, fmt):
+    """Zapíše tabulku jako `<path_base>.<fmt>` a vrátí cestu."""
+    # Popisky dimenzí mohou míchat čísla a text - Parquet chce jeden typ
+    df = df.astype({col: "string" for col in df.columns if df[col].dtype == object})
+    path = f"{path_base}.{fmt}"
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def run(input_dir, output_dir, fmt="parquet", workers=None, pdf=False, kpi_days=DEFAULT_KPI_DAYS,
+        pattern="*.xlsx", progress=None):
+    """Zpracuje všechny reporty z `input_dir` a vrátí seznam zapsaných souborů."""
+    paths = sorted(glob.glob(os.path.join(input_dir, pattern)))
+    # Dočasné soubory Excelu (~$...) nejsou reporty
+    paths = [p for p in paths if not os.path.basename(p).startswith("~$")]
+    os.makedirs(output_dir, exist_ok=True)
+
+    files, cells = process_reports(paths, workers=workers, progress=progress)
+    written = [write_table(files, os.path.join(output_dir, "soubory"), fmt)] if len(files) else []
+    if cells is None:
+        return written
+
+    view = CubeView(cells)
+    for name, table in aggregate_tables(view, kpi_days).items():
+        written.append(write_table(table, os.path.join(output_dir, name), fmt))
+
+    if pdf:
+        first_day = cells[DATE_COLUMN].min().date()
+        last_day = cells[DATE_COLUMN].max().date()
+        pdf_bytes = dashboard_pdf(
+            figures.dashboard_figures(view),
+            "Dashboard - Výjezdy do oprav",
+            f"Období {first_day} - {last_day}, {view.total()} záznamů z {len(files)} souborů "
+            f"(vytvořeno {datetime.datetime.now():%Y-%m-%d %H:%M})"
+        )
+        path = os.path.join(output_dir, "dashboard.pdf")
+        with open(path, "wb") as f:
+            f.write(pdf_bytes)
+        written.append(path)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Dávkové zpracování Excel reportů výjezdů do oprav.")
+    parser.add_argument("input_dir", help="adresář s reporty (*.xlsx)")
+    parser.add_argument("output_dir", help="adresář pro výstupy")
+    parser.add_argument("--format", choices=FORMATS, default="parquet", help="formát tabulek (výchozí parquet)")
+    parser.add_argument("--workers", type=int, default=None, help="počet procesů (výchozí počet jader)")
+    parser.add_argument("--pdf", action="store_true", help="vytvořit i PDF s grafy dashboardu")
+    parser.add_argument("--kpi-days", type=int, default=DEFAULT_KPI_DAYS, help="délka období pro KPI ve dnech")
+    parser.add_argument("--pattern", default="*.xlsx", help="maska souborů (výchozí *.xlsx)")
+    args = parser.parse_args(argv)
+
+    def progress(done, total, summary):
+        status = summary["chyba"] or f"{summary['radku']} řádků"
+        print(f"[{done}/{total}] {summary['soubor']}: {status} ({summary['sekund']} s)", file=sys.stderr)
+
+    started = time.perf_counter()
+    try:
+        written = run(
+            args.input_dir, args.output_dir, fmt=args.format, workers=args.workers,
+            pdf=args.pdf, kpi_days=args.kpi_days, pattern=args.pattern, progress=progress
+        )
+    except PdfExportError as e:
+        print(f"PDF se nepodařilo vytvořit: {e}", file=sys.stderr)
+        return 1
+    for path in written:
+        print(path)
+    print(f"Hotovo za {time.perf_counter() - started:.1f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
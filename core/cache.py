@@ -0,0 +1,123 @@
+"""
+Disková cache zparsovaných reportů.
+
+Normalizované DataFrame se ukládají jen jako Parquet pod hashem obsahu
+souboru. Pickle se nepoužívá - adresář cache leží ve sdíleném tempu
+a načtení podstrčeného pickle by znamenalo spuštění cizího kódu.
+"""
+import os
+
+import pandas as pd
+
+from core.paths import DEFAULT_CACHE_DIR
+
+# Výchozí velikost diskové cache (lze přepsat proměnnou prostředí)
+DEFAULT_CACHE_MAX_MB = int(os.environ.get("EXCEL_ANALYZE_CACHE_MAX_MB", "1024"))
+
+
+def _is_mixed(values):
+    """Obsahují hodnoty (bez prázdných) víc než jeden Python typ?"""
+    return len({type(v) for v in values if not pd.isna(v)}) > 1
+
+
+def _parquet_ready(df):
+    """Kopie `df`, ve které jsou sloupce se smíšenými typy převedené na text."""
+    converted = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            if series.cat.categories.dtype == object and _is_mixed(series.cat.categories):
+                converted[col] = series.cat.rename_categories([str(v) for v in series.cat.categories])
+        elif series.dtype == object and _is_mixed(series.unique()):
+            converted[col] = series.where(series.isna(), series.astype(str))
+    return df.assign(**converted)
+
+
+class ParquetCache:
+    """
+    Disková cache normalizovaných DataFrame uložených jako Parquet.
+
+    Klíčem je hash obsahu souboru. Při překročení limitu velikosti se mažou
+    nejdéle nepoužité položky (LRU podle času posledního přístupu).
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key, ext):
+        return os.path.join(self.directory, f"{key}{ext}")
+
+    def _existing_path(self, key):
+        path = self._path(key, ".parquet")
+        return path if os.path.exists(path) else None
+
+    def __contains__(self, key):
+        return self._existing_path(key) is not None
+
+    def get(self, key):
+        """Vrátí DataFrame pro daný klíč, nebo None, pokud v cache není."""
+        path = self._existing_path(key)
+        if path is None:
+            return None
+        try:
+            df = pd.read_parquet(path)
+        except Exception:
+            # Poškozený soubor (např. přerušený zápis) - zahodíme ho
+            self._remove(path)
+            return None
+        # Aktualizace času přístupu pro LRU
+        os.utime(path, None)
+        return df
+
+    def put(self, key, df):
+        """Uloží DataFrame pod daný klíč a případně uvolní místo."""
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(tmp_fd)
+        try:
+            try:
+                df.to_parquet(tmp_path, index=False)
+            except (ValueError, TypeError, NotImplementedError):
+                # Sloupce se smíšenými typy (čísla i text) se uloží jako text
+                _parquet_ready(df).to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self._path(key, ".parquet"))
+        except (ImportError, ValueError, TypeError, NotImplementedError):
+            # Ani po převodu nejde do Parquetu - dataset se necachuje
+            return
+        finally:
+            if os.path.exists(tmp_path):
+                self._remove(tmp_path)
+        self.evict()
+
+    def entries(self):
+        """Seznam (cesta, velikost, čas přístupu) od nejstaršího po nejnovější."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".parquet"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda e: e[2])
+
+    def evict(self):
+        """Maže nejdéle nepoužité položky, dokud cache nepřesahuje limit."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        # Poslední (právě zapsanou) položku ponecháme vždy
+        for path, size, _ in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
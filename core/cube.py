@@ -0,0 +1,168 @@
+"""
+Předagregovaná denní kostka počtů výjezdů pro grafy dashboardu.
+
+Kostka má jeden řádek pro každou existující kombinaci dne a dimenzí
+z CUBE_DIMENSIONS a počet výjezdů v ní. Obsahuje jen dimenze s málo
+hodnotami - s PPlatz nebo Storort by buněk bylo skoro tolik jako řádků.
+Kostka se použije, jen když opravdu komprimuje (nejvýše MAX_CELL_RATIO
+buněk na řádek) a filtr i graf se týkají jen jejích dimenzí; jinak se
+počítá z vyfiltrovaných řádků.
+
+Buňky pro přenos mezi procesy (`core.batch`) nesou všechny dimenze
+grafů (CHART_DIMENSIONS).
+"""
+import pandas as pd
+
+from core.filters import FilterIndex
+from core.memo import per_dataset
+from core.schema import DATE_COLUMN
+
+CUBE_DIMENSIONS = ["Linie", "Fehler", "Fehler Popis", "Zarizeni"]
+
+# Všechny dimenze, podle kterých grafy dashboardu počítají
+CHART_DIMENSIONS = ["Linie", "PPlatz", "Storort Popis", "Zarizeni", "Fehler", "Fehler Popis"]
+
+# Kostka s víc buňkami na řádek než tolik se nepoužívá (řádky jsou rychlejší)
+MAX_CELL_RATIO = 0.25
+
+COUNT_COLUMN = "Pocet"
+
+
+def _group_counts(data, keys):
+    """Počty za skupiny `keys` - součet COUNT_COLUMN u buněk, počet řádků u řádků."""
+    grouped = data.groupby(keys, observed=True)
+    if COUNT_COLUMN in data.columns:
+        return grouped[COUNT_COLUMN].sum()
+    return grouped.size()
+
+
+class CubeView:
+    """
+    Vyfiltrovaná data a jejich agregace pro jednotlivé grafy.
+
+    `cells` jsou buňky kostky (se sloupcem COUNT_COLUMN), nebo přímo
+    vyfiltrované řádky (každý se počítá jednou). S `rows` se agregace přes
+    dimenzi, kterou buňky nemají, počítá z těchto řádků.
+    """
+
+    def __init__(self, cells, rows=None):
+        self.cells = cells
+        self.rows = rows
+
+    def _source(self, *columns):
+        if self.rows is not None and not set(columns) <= set(self.cells.columns):
+            return self.rows
+        return self.cells
+
+    def total(self):
+        """Celkový počet výjezdů ve výběru."""
+        if COUNT_COLUMN in self.cells.columns:
+            return int(self.cells[COUNT_COLUMN].sum())
+        return len(self.cells)
+
+    def counts(self, column, label=None):
+        """
+        Počty podle jedné dimenze jako DataFrame [label, "Pocet"], seřazené
+        sestupně.
+        """
+        counts = _group_counts(self._source(column), column)
+        counts = counts[counts > 0].sort_values(ascending=False, kind="stable")
+        return pd.DataFrame({
+            label or column: counts.index.astype(object),
+            COUNT_COLUMN: counts.to_numpy(),
+        })
+
+    def daily(self, label="Datum"):
+        """Počty po dnech jako DataFrame [label, "Pocet"]."""
+        series = _group_counts(self.cells, DATE_COLUMN)
+        return series.rename_axis(label).reset_index(name=COUNT_COLUMN)
+
+    def matrix(self, index, columns, require=None):
+        """
+        Matice počtů index x columns s nulami v prázdných buňkách.
+
+        `require` je sloupec, který musí být vyplněný (odpovídá hodnotě
+        `values` v `pivot_table(..., aggfunc="count")`).
+        """
+        data = self._source(*[col for col in (index, columns, require) if col is not None])
+        if require is not None:
+            data = data[data[require].notna()]
+        return _group_counts(data, [index, columns]).unstack(columns, fill_value=0)
+
+
+def cube_cells(df, dimensions=CHART_DIMENSIONS):
+    """Buňky kostky: počet řádků pro každou kombinaci dne a dimenzí, seřazené podle dne."""
+    cells = (
+        df.groupby([DATE_COLUMN] + list(dimensions), observed=True, dropna=False, sort=False)
+        .size()
+        .reset_index(name=COUNT_COLUMN)
+    )
+    return cells.sort_values(DATE_COLUMN, kind="stable", ignore_index=True)
+
+
+def merge_cells(parts, dimensions=CHART_DIMENSIONS):
+    """Sloučí buňky kostek více datasetů (počty stejných kombinací se sečtou)."""
+    cells = (
+        pd.concat(parts, ignore_index=True)
+        .groupby([DATE_COLUMN] + list(dimensions), observed=True, dropna=False, sort=False)[COUNT_COLUMN]
+        .sum()
+        .reset_index()
+    )
+    return cells.sort_values(DATE_COLUMN, kind="stable", ignore_index=True)
+
+
+class CountCube:
+    """Denní kostka počtů nad CUBE_DIMENSIONS pro jeden dataset."""
+
+    def __init__(self, df, dimensions=CUBE_DIMENSIONS):
+        self.dimensions = list(dimensions)
+        self.n_rows = len(df)
+        cells = cube_cells(df, self.dimensions)
+        self.n_cells = len(cells)
+        self.compresses = self.n_cells <= MAX_CELL_RATIO * self.n_rows
+        # Nekomprimující kostka se nepoužije - buňky se nedrží v paměti
+        self.cells = cells if self.compresses else cells.iloc[:0]
+        self.counts = self.cells[COUNT_COLUMN].to_numpy()
+        self.filter_index = FilterIndex(self.cells, columns=self.dimensions)
+
+    def __len__(self):
+        return self.n_cells
+
+    @property
+    def cell_ratio(self):
+        """Počet buněk na řádek datasetu (1 = kostka nic nekomprimuje)."""
+        return self.n_cells / self.n_rows if self.n_rows else 0.0
+
+    def answers(self, columns):
+        """Zda kostka komprimuje a zná všechny dimenze `columns`."""
+        return self.compresses and set(columns) <= set(self.dimensions)
+
+    def filter(self, date_from, date_to, selections=None, rows=None):
+        """
+        Buňky kostky odpovídající filtrům (stejná sémantika jako FilterIndex);
+        `rows` jsou vyfiltrované řádky pro grafy přes dimenze mimo kostku.
+        """
+        positions = self.filter_index.select(date_from, date_to, selections)
+        return CubeView(self.cells.iloc[positions], rows=rows)
+
+    def facet_counts(self, date_from, date_to, selections=None):
+        """Počty výjezdů pro hodnoty filtrů (viz `FilterIndex.facet_counts`) z buněk kostky."""
+        return self.filter_index.facet_counts(date_from, date_to, selections, weights=self.counts)
+
+
+def get_cube(df):
+    """Vrátí (a při prvním volání postaví) kostku pro daný DataFrame."""
+    return per_dataset(df, "count_cube", CountCube)
+
+
+def chart_view(df, view):
+    """
+    `CubeView` pro grafy vyfiltrovaného pohledu `view` (`core.filter_state.FilterView`):
+    z kostky, pokud komprimuje a zná všechny filtrované dimenze a filtr
+    nemá fulltext (ten kostka nezná), jinak z vyfiltrovaných řádků.
+    """
+    selected = [col for col, values in (view.selections or {}).items() if values is not None]
+    cube = get_cube(df)
+    if view.text_mask is None and cube.answers(selected):
+        return cube.filter(view.date_from, view.date_to, view.selections, rows=view.df)
+    return CubeView(view.df)
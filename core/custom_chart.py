@@ -0,0 +1,227 @@
+"""
+Grafy stránky "Vlastní graf" s režimem pro velká data.
+
+Do `LARGE_DATA_THRESHOLD` řádků se graf kreslí z jednotlivých řádků jako
+dřív. Nad ním se data redukují na serveru: Bar a Line se agregují podle
+x a barvy, Scatter přejde na WebGL (a nad `DENSITY_FACTOR` násobkem na
+hustotní mapu), Histogram a Box se kreslí z předpočítaných binů
+a kvantilů.
+"""
+import numpy as np
+import pandas as pd
+
+from core.aggregate import numeric_view
+
+CHART_TYPES = ["Bar", "Line", "Scatter", "Histogram", "Box"]
+
+# Nad tímto počtem řádků se zapíná režim pro velká data
+LARGE_DATA_THRESHOLD = 20_000
+
+# Scatter nad threshold * DENSITY_FACTOR bodů se kreslí jako hustotní mapa
+DENSITY_FACTOR = 10
+
+HISTOGRAM_BINS = 50
+
+WIDTH = 1200
+HEIGHT = 700
+
+
+def _layout(chart_type):
+    return dict(title=f"{chart_type} graf", width=WIDTH, height=HEIGHT)
+
+
+def _group_keys(df, x, color):
+    """Klíče skupin pro agregaci: x (časové x zaokrouhlené na dny) a barva."""
+    keys = [df[x].dt.floor("D") if pd.api.types.is_datetime64_any_dtype(df[x]) else df[x]]
+    if color and color != x:
+        keys.append(df[color])
+    return keys
+
+
+def _is_numeric(series):
+    return pd.api.types.is_numeric_dtype(numeric_view(series))
+
+
+def _aggregate(df, x, y, color, how):
+    """Součet/průměr y (nebo počet řádků) za skupiny x a barvy."""
+    keys = _group_keys(df, x, color)
+    if y is None or y in (x, color) or not _is_numeric(df[y]):
+        return df.groupby(keys, observed=True).size().reset_index(name="Pocet"), "Pocet"
+    values = numeric_view(df[y]).groupby(keys, observed=True)
+    return getattr(values, how)().reset_index(name=y), y
+
+
+def _histogram_bins(df, x, color):
+    """Počty v binech (číselné/datumové x) nebo podle hodnot (ostatní x)."""
+    groups = [(None, df)] if not color or color == x else df.groupby(color, observed=True)
+    series = df[x]
+    if isinstance(series.dtype, pd.CategoricalDtype) or not (
+        pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)
+    ):
+        counts = df.groupby(_group_keys(df, x, color), observed=True).size().reset_index(name="Pocet")
+        return counts, False
+
+    is_datetime = pd.api.types.is_datetime64_any_dtype(series)
+    as_number = series.astype("int64") if is_datetime else series.astype("float64")
+    edges = np.histogram_bin_edges(as_number.dropna(), bins=HISTOGRAM_BINS)
+    frames = []
+    for value, group in groups:
+        values = group[x].dropna()
+        values = values.astype("int64") if is_datetime else values.astype("float64")
+        counts, _ = np.histogram(values, bins=edges)
+        frame = pd.DataFrame({"start": edges[:-1], "end": edges[1:], "Pocet": counts})
+        if value is not None:
+            frame[color] = value
+        frames.append(frame)
+    bins = pd.concat(frames, ignore_index=True)
+    bins["stred"] = (bins["start"] + bins["end"]) / 2
+    bins["sirka"] = bins["end"] - bins["start"]
+    if is_datetime:
+        bins["stred"] = pd.to_datetime(bins["stred"].astype("int64"), unit=series.dt.unit)
+        # Šířka sloupce v milisekundách (plotly měří datumovou osu v ms)
+        bins["sirka"] = pd.to_timedelta(bins["sirka"].astype("int64"), unit=series.dt.unit) / pd.Timedelta(milliseconds=1)
+    return bins, True
+
+
+def _box_stats(values, keys):
+    """
+    Kvartily a whiskery (nejkrajnější hodnoty do 1.5 IQR) za skupiny,
+    počítané vektorově přes groupby.
+    """
+    grouped = values.groupby(keys, observed=True)
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ["q1", "median", "q3"]
+    iqr = stats["q3"] - stats["q1"]
+    # Meze whiskerů skupiny rozšířené na jednotlivé řádky
+    # (řádky s prázdným klíčem nepatří do žádné skupiny)
+    group_ids = grouped.ngroup()
+    in_group = group_ids.notna().to_numpy()
+    group_ids = group_ids.fillna(0).astype("int64").to_numpy()
+    low_limit = np.where(in_group, (stats["q1"] - 1.5 * iqr).to_numpy()[group_ids], np.nan)
+    high_limit = np.where(in_group, (stats["q3"] + 1.5 * iqr).to_numpy()[group_ids], np.nan)
+    stats["lowerfence"] = values.where(values.to_numpy() >= low_limit).groupby(keys, observed=True).min()
+    stats["upperfence"] = values.where(values.to_numpy() <= high_limit).groupby(keys, observed=True).max()
+    return stats.dropna(subset=["median"])
+
+
+def _box_figure(df, x, y, color, chart_type):
+    """
+    Box graf z předpočítaných kvantilů (bez posílání surových hodnot).
+    Pro nečíselné hodnoty vrací None.
+    """
+    import plotly.graph_objects as go
+
+    value_col = y if y is not None else x
+    values = numeric_view(df[value_col])
+    if not pd.api.types.is_numeric_dtype(values):
+        return None
+    values = values.astype("float64")
+
+    by_color = bool(color) and color != x
+    if y is None or x == y:
+        keys = [pd.Series(value_col, index=df.index)]
+    else:
+        keys = _group_keys(df, x, None)
+    if by_color:
+        keys.append(df[color])
+    stats = _box_stats(values, keys)
+
+    fig = go.Figure()
+    traces = stats.groupby(level=-1, observed=True) if by_color else [(value_col, stats)]
+    for name, part in traces:
+        fig.add_trace(go.Box(
+            x=list(part.index.get_level_values(0)),
+            name=str(name),
+            **{field: part[field].tolist() for field in ["q1", "median", "q3", "lowerfence", "upperfence"]}
+        ))
+    fig.update_layout(boxmode="group", xaxis_title=x, yaxis_title=value_col, **_layout(chart_type))
+    return fig
+
+
+def _density_bins(series, bins):
+    """Hodnoty osy převedené na biny (čísla), dny (datum) nebo ponechané (kategorie)."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.floor("D")
+    if isinstance(series.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(series):
+        return series
+    values = series.astype("float64")
+    edges = np.histogram_bin_edges(values.dropna(), bins=bins)
+    mids = (edges[:-1] + edges[1:]) / 2
+    positions = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(mids) - 1)
+    return pd.Series(mids[positions], index=series.index).where(values.notna())
+
+
+def _density_figure(df, x, y, chart_type):
+    """Hustotní mapa z binů spočítaných na serveru."""
+    import plotly.graph_objects as go
+
+    counts = pd.crosstab(_density_bins(df[y], 100), _density_bins(df[x], 100))
+    fig = go.Figure(go.Heatmap(
+        z=counts.to_numpy(),
+        x=counts.columns.astype(object).tolist(),
+        y=counts.index.astype(object).tolist(),
+        colorscale="YlOrRd"
+    ))
+    fig.update_layout(xaxis_title=x, yaxis_title=y, **_layout(chart_type))
+    return fig
+
+
+def build_figure(df, chart_type, x, y=None, color=None, threshold=LARGE_DATA_THRESHOLD):
+    """
+    Sestaví graf a vrátí (figure, upozornění). Upozornění je None, pokud
+    se kreslí všechny řádky, jinak popisuje provedenou redukci.
+    """
+    import plotly.express as px
+
+    color = color or None
+    n_rows = len(df)
+    if n_rows <= threshold:
+        kwargs = dict(x=x, color=color, **_layout(chart_type))
+        if chart_type == "Bar":
+            return px.bar(df, y=y, **kwargs), None
+        if chart_type == "Line":
+            return px.line(df, y=y, **kwargs), None
+        if chart_type == "Scatter":
+            return px.scatter(df, y=y, **kwargs), None
+        if chart_type == "Histogram":
+            return px.histogram(df, **kwargs), None
+        if chart_type == "Box":
+            return px.box(df, y=y, **kwargs), None
+        return None, None
+
+    if chart_type in ("Bar", "Line"):
+        how = "sum" if chart_type == "Bar" else "mean"
+        data, y_col = _aggregate(df, x, y, color, how)
+        plot = px.bar if chart_type == "Bar" else px.line
+        fig = plot(data, x=x, y=y_col, color=color, **_layout(chart_type))
+        what = "počet řádků" if y_col == "Pocet" else ("součet" if how == "sum" else "průměr") + f" {y_col}"
+        by = f"{x} po dnech" if pd.api.types.is_datetime64_any_dtype(df[x]) else x
+        if color and color != x:
+            by += f" a {color}"
+        return fig, f"{n_rows} řádků agregováno na {len(data)} bodů ({what} podle {by})."
+
+    if chart_type == "Scatter":
+        if n_rows > threshold * DENSITY_FACTOR and y is not None:
+            fig = _density_figure(df, x, y, chart_type)
+            return fig, f"{n_rows} bodů zobrazeno jako hustotní mapa."
+        fig = px.scatter(df, x=x, y=y, color=color, render_mode="webgl", **_layout(chart_type))
+        return fig, f"{n_rows} bodů vykresleno přes WebGL."
+
+    if chart_type == "Histogram":
+        bins, numeric = _histogram_bins(df, x, color)
+        bar_color = color if color != x else None
+        if numeric:
+            fig = px.bar(bins, x="stred", y="Pocet", color=bar_color, **_layout(chart_type))
+            fig.update_traces(width=bins["sirka"].iloc[0] if len(bins) else None)
+            fig.update_layout(bargap=0, xaxis_title=x)
+        else:
+            fig = px.bar(bins, x=x, y="Pocet", color=bar_color, **_layout(chart_type))
+        return fig, f"Histogram {n_rows} řádků spočítán na serveru ({len(bins)} binů)."
+
+    if chart_type == "Box":
+        fig = _box_figure(df, x, y, color, chart_type)
+        if fig is None:
+            return None, "Box graf pro velká data potřebuje číselné hodnoty."
+        return fig, f"Box graf {n_rows} řádků spočítán z kvantilů na serveru."
+
+    return None, None
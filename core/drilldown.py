@@ -0,0 +1,160 @@
+"""
+Index skupin pro detailní (drill-down) sekce dashboardu.
+
+Pro složený klíč (např. PPlatz, Linie, Fehler) se jednou pro dataset
+spočítá skupina každého řádku a pozice řádků každé skupiny. Výběr
+v sekci je pak jen výřez předpočítaných pozic, zúžený na aktuální filtr -
+bez porovnávání sloupců přes celý `df_filtered`. Nabídky výběrů obsahují
+jen kombinace klíčů, které ve filtru existují, s počty řádků.
+"""
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from core.memo import per_dataset
+from core.search import get_text_index, query_terms
+
+# Sekce dashboardu -> sloupce složeného klíče
+DRILLDOWNS = {
+    "pplatz_linie_fehler": ["PPlatz", "Linie", "Fehler"],
+    "linie_storort": ["Linie", "Storort Popis"],
+}
+
+# Sloupce tabulky pro výběr detailního záznamu
+DETAIL_COLUMNS = ["Datum", "PPlatz", "Linie", "Fehler", "Fab Nr", "Material Nr", "Komentar"]
+
+# Sloupce, ve kterých hledání záznamu porovnává čísla
+LOOKUP_COLUMNS = ["Fab Nr", "Material Nr", "PPlatz"]
+
+COUNT_COLUMN = "Pocet"
+
+
+def _codes(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.cat.codes.to_numpy().astype(np.int64), pd.Index(series.cat.categories)
+    codes, values = pd.factorize(series, sort=True)
+    return codes.astype(np.int64), pd.Index(values)
+
+
+class GroupIndex:
+    """Skupiny řádků podle složeného klíče `columns` a jejich pozice."""
+
+    def __init__(self, df, columns):
+        self.columns = list(columns)
+        self.n_rows = len(df)
+        combined = np.zeros(self.n_rows, dtype=np.int64)
+        valid = np.ones(self.n_rows, dtype=bool)
+        values = []
+        for col in self.columns:
+            codes, col_values = _codes(df[col])
+            valid &= codes >= 0
+            # Kódy sloupců složené do jednoho čísla (smíšená soustava)
+            combined = combined * max(len(col_values), 1) + np.maximum(codes, 0)
+            values.append(col_values)
+
+        group_keys, group_of_valid = np.unique(combined[valid], return_inverse=True)
+        self.group_of_row = np.full(self.n_rows, -1, dtype=np.int64)
+        self.group_of_row[valid] = group_of_valid
+        self.n_groups = len(group_keys)
+
+        # Pozice řádků seřazené podle skupiny; skupina g je order[offsets[g]:offsets[g + 1]]
+        self.order = np.flatnonzero(valid)[np.argsort(group_of_valid, kind="stable")]
+        self.offsets = np.zeros(self.n_groups + 1, dtype=np.int64)
+        np.cumsum(np.bincount(group_of_valid, minlength=self.n_groups), out=self.offsets[1:])
+
+        # Hodnoty klíče každé skupiny (rozklad složeného čísla zpět)
+        keys = {}
+        rest = group_keys
+        for col, col_values in reversed(list(zip(self.columns, values))):
+            size = max(len(col_values), 1)
+            keys[col] = col_values[rest % size]
+            rest = rest // size
+        self.keys = pd.DataFrame({col: keys[col] for col in self.columns})
+        self._last_counts = None
+
+    def counts(self, positions):
+        """
+        Skupiny s alespoň jedním řádkem z `positions` (pozice vyfiltrovaných
+        řádků) jako DataFrame [sloupce klíče..., "Pocet"] s indexem skupiny.
+        """
+        if self._last_counts is not None and self._last_counts[0] is positions:
+            return self._last_counts[1]
+        groups = self.group_of_row[positions]
+        counts = np.bincount(groups[groups >= 0], minlength=self.n_groups)
+        present = np.flatnonzero(counts)
+        result = self.keys.iloc[present].assign(**{COUNT_COLUMN: counts[present]})
+        result.index = present
+        self._last_counts = (positions, result)
+        return result
+
+    def rows(self, groups, row_mask=None):
+        """Seřazené pozice řádků skupin `groups`, případně jen ty v `row_mask`."""
+        parts = [self.order[self.offsets[g]:self.offsets[g + 1]] for g in groups]
+        positions = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int64)
+        if row_mask is not None:
+            positions = positions[row_mask[positions]]
+        return positions
+
+
+def get_group_index(df, name):
+    """Vrátí (a při prvním volání postaví) GroupIndex sekce `name` z DRILLDOWNS."""
+    return per_dataset(df, f"group_index:{name}", lambda data: GroupIndex(data, DRILLDOWNS[name]))
+
+
+def matching_groups(available, chosen):
+    """Dostupné skupiny odpovídající zvoleným hodnotám `chosen` ({sloupec: hodnota nebo seznam})."""
+    matching = available
+    for col, value in chosen.items():
+        if isinstance(value, list):
+            matching = matching[matching[col].isin(value)]
+        else:
+            matching = matching[matching[col] == value]
+    return matching
+
+
+def level_options(available, chosen):
+    """
+    Hodnoty dalšího sloupce klíče mezi dostupnými skupinami odpovídajícími
+    `chosen` a počty jejich řádků ve filtru (sestupně).
+    """
+    next_col = available.columns[len(chosen)]
+    counts = matching_groups(available, chosen).groupby(next_col, sort=True)[COUNT_COLUMN].sum()
+    return counts.sort_values(ascending=False, kind="stable")
+
+
+def level_select(label, counts, key):
+    """Selectbox hodnot jedné úrovně klíče s počty řádků ve filtru."""
+    # Hodnota z předchozího filtru, která už v nabídce není, se zahodí
+    if key in st.session_state and st.session_state[key] not in counts.index:
+        del st.session_state[key]
+    return st.selectbox(label, counts.index.tolist(), format_func=lambda v: f"{v} ({counts[v]})", key=key)
+
+
+def level_multiselect(label, counts, key):
+    """Multiselect hodnot jedné úrovně klíče; vybrané hodnoty mimo nabídku se zahodí."""
+    options = counts.index.tolist()
+    if key in st.session_state:
+        st.session_state[key] = [v for v in st.session_state[key] if v in counts.index]
+    return st.multiselect(label, options, format_func=lambda v: f"{v} ({counts[v]})", key=key)
+
+
+def lookup_positions(df, positions, query):
+    """
+    Pozice z `positions` odpovídající hledání záznamu. Každé slovo dotazu
+    musí být začátkem slova v textových sloupcích (`core.search`), nebo -
+    je-li to číslo - přesně hodnotou některého z LOOKUP_COLUMNS.
+    """
+    terms = query_terms(query)
+    if not terms:
+        return positions
+    text_index = get_text_index(df)
+    mask = np.ones(len(positions), dtype=bool)
+    for term in terms:
+        term_mask = text_index.term_mask(term)[positions]
+        if term.isdigit():
+            number = int(term)
+            for col in LOOKUP_COLUMNS:
+                values = df[col].iloc[positions]
+                term_mask |= (values == number).fillna(False).to_numpy(dtype=bool)
+        mask &= term_mask
+    return positions[mask]
@@ -0,0 +1,205 @@
+"""
+Export tabulek do xlsx, Parquet a CSV po částech.
+
+Tabulka se zapisuje do souboru na disku po CHUNK_ROWS řádcích - xlsx
+v režimu write-only openpyxl, Parquet po row groups, CSV připisováním -
+takže paměť navíc odpovídá jedné části, ne celé tabulce. Hotové soubory
+se pamatují pro každý dataset pod podpisem výběru a názvem tabulky;
+opakovaný export stejného výběru se jen znovu odešle.
+"""
+import os
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+from core.cache import DEFAULT_CACHE_DIR
+from core.memo import per_dataset
+
+# Formát -> MIME typ
+FORMATS = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+    "csv": "text/csv",
+}
+
+CHUNK_ROWS = 50_000
+
+# Řádky listu Excelu bez hlavičky
+EXCEL_MAX_ROWS = 1_048_575
+
+# Počet exportovaných souborů držených pro jeden dataset
+EXPORT_MEMO_SIZE = 8
+
+EXPORT_DIR = os.path.join(DEFAULT_CACHE_DIR, "exports")
+
+
+class ExportTooLarge(ValueError):
+    """Tabulka se do zvoleného formátu nevejde."""
+
+
+def flat_table(table):
+    """Tabulka s indexem převedeným na sloupce a jednoúrovňovými názvy sloupců (pivoty)."""
+    table = table.reset_index()
+    if isinstance(table.columns, pd.MultiIndex):
+        table.columns = [
+            " / ".join(str(part) for part in col if part != "") for col in table.columns
+        ]
+    return table
+
+
+def _chunks(table):
+    """Části tabulky po CHUNK_ROWS řádcích (prázdná tabulka je jedna prázdná část)."""
+    if not len(table):
+        yield table
+    for start in range(0, len(table), CHUNK_ROWS):
+        yield table.iloc[start:start + CHUNK_ROWS]
+
+
+def _cell_values(series):
+    """Hodnoty sloupce jako Python objekty pro openpyxl (prázdné = None)."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return [None if pd.isna(v) else v.to_pydatetime() for v in series]
+    return series.astype(object).where(series.notna(), None).tolist()
+
+
+def _write_xlsx(table, path):
+    if len(table) > EXCEL_MAX_ROWS:
+        raise ExportTooLarge(
+            f"Tabulka má {len(table)} řádků, list Excelu jich pojme {EXCEL_MAX_ROWS}. "
+            "Použij CSV nebo Parquet."
+        )
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Data")
+    ws.append([str(col) for col in table.columns])
+    for chunk in _chunks(table):
+        for row in zip(*(_cell_values(chunk[col]) for col in chunk.columns)):
+            ws.append(row)
+    wb.save(path)
+
+
+def _arrow_ready(chunk):
+    """Popisky mohou míchat čísla a text - Parquet chce v jednom sloupci jeden typ."""
+    text_columns = {}
+    for col in chunk.columns:
+        dtype = chunk[col].dtype
+        if dtype == object or (isinstance(dtype, pd.CategoricalDtype) and dtype.categories.dtype == object):
+            text_columns[col] = "string"
+    return chunk.astype(text_columns)
+
+
+def _write_parquet(table, path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    table = table.rename(columns=str)
+    writer = None
+    try:
+        for chunk in _chunks(table):
+            schema = None if writer is None else writer.schema
+            arrow = pa.Table.from_pandas(_arrow_ready(chunk), schema=schema, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, arrow.schema)
+            writer.write_table(arrow)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_csv(table, path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i, chunk in enumerate(_chunks(table)):
+            chunk.to_csv(f, header=i == 0, index=False)
+
+
+_WRITERS = {"xlsx": _write_xlsx, "parquet": _write_parquet, "csv": _write_csv}
+
+
+def _remove_files(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class _ExportFiles:
+    """Exportované soubory jednoho datasetu (LRU); se zánikem datasetu se smažou."""
+
+    def __init__(self):
+        self.paths = OrderedDict()
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, _remove_files, self.paths.values())
+
+    def get(self, key):
+        with self._lock:
+            path = self.paths.get(key)
+            if path is None or not os.path.exists(path):
+                return None
+            self.paths.move_to_end(key)
+            return path
+
+    def put(self, key, path):
+        """Uloží soubor pod `key` a vrátí platnou cestu (souběžně zapsaný dřív vyhrává)."""
+        with self._lock:
+            existing = self.paths.get(key)
+            if existing is not None and os.path.exists(existing):
+                _remove_files([path])
+                self.paths.move_to_end(key)
+                return existing
+            self.paths[key] = path
+            while len(self.paths) > EXPORT_MEMO_SIZE:
+                _remove_files([self.paths.popitem(last=False)[1]])
+            return path
+
+
+def export_file(table, name, fmt, dataset, signature):
+    """
+    Cesta k souboru s `table` ve formátu `fmt`. Pro stejný dataset,
+    `signature` a `name` se soubor zapisuje jen jednou.
+    """
+    files = per_dataset(dataset, "exports", lambda _: _ExportFiles())
+    key = (signature, name, fmt)
+    path = files.get(key)
+    if path is not None:
+        return path
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}", dir=EXPORT_DIR)
+    os.close(fd)
+    try:
+        _WRITERS[fmt](table, path)
+    except BaseException:
+        _remove_files([path])
+        raise
+    return files.put(key, path)
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def download_buttons(table, name, file_stem, dataset, signature, key):
+    """
+    Tlačítka pro stažení `table` ve všech formátech. Soubor se zapisuje až
+    po kliknutí (mimo rerun stránky) a kliknutí stránku nepřekresluje.
+    """
+    columns = st.columns(len(FORMATS))
+    for column, (fmt, mime) in zip(columns, FORMATS.items()):
+        too_large = fmt == "xlsx" and len(table) > EXCEL_MAX_ROWS
+        column.download_button(
+            f"Stáhnout {fmt.upper()}",
+            lambda fmt=fmt: _read(export_file(table, name, fmt, dataset, signature)),
+            file_name=f"{file_stem}.{fmt}",
+            mime=mime,
+            key=f"{key}_{fmt}",
+            on_click="ignore",
+            disabled=too_large,
+            help=f"List Excelu pojme nejvýš {EXCEL_MAX_ROWS} řádků." if too_large else None
+        )
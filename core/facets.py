@@ -0,0 +1,69 @@
+"""
+Fasetové filtry postranního panelu.
+
+Každý filtr nabízí jen hodnoty, které jsou při výběru ostatních filtrů,
+období a fulltextu ještě možné, a u každé hodnoty ukazuje počet výjezdů.
+Počty se berou z bitmap předpočítaných indexů (bez průchodu řádky); bez
+fulltextu z buněk kostky počtů, pokud jich je výrazně méně než řádků
+a kostka zná všechny filtrované dimenze. Prázdný výběr znamená "vše" a do
+filtru se předává jako None - seznam všech hodnot se nikde nesestavuje
+ani neposílá do prohlížeče.
+"""
+import streamlit as st
+
+from core.cube import get_cube
+from core.filters import get_filter_index
+
+# Filtrované dimenze a jejich popisky v postranním panelu
+FACETS = [
+    ("Linie", "Linky"),
+    ("Fehler", "Fehler kód"),
+    ("Zarizeni", "Zařízení"),
+    ("Storort Popis", "Storort Bezeichnung"),
+    ("Fehler Popis", "Fehler Popis"),
+]
+
+
+def facet_counts(df, date_from, date_to, selections, text_mask=None):
+    """
+    Počty výjezdů pro každou hodnotu každého filtru při výběru ostatních
+    filtrů jako {sloupec: Series}. `text_mask` je maska fulltextu
+    (`core.search.TextIndex.search`), kterou kostka nezná - s ní, nebo
+    když kostka nekomprimuje, se počítá z indexu řádků.
+    """
+    if text_mask is None:
+        # Kostka musí znát všechny filtry a komprimovat (`CountCube.answers`)
+        cube = get_cube(df)
+        if cube.answers([col for col, _ in FACETS]):
+            return cube.facet_counts(date_from, date_to, selections)
+    return get_filter_index(df).facet_counts(date_from, date_to, selections, row_mask=text_mask)
+
+
+def facet_filters(df, date_from, date_to, text_mask=None, key_prefix="filtr", on_change=None):
+    """
+    Vykreslí fasetové multiselecty do aktuálního kontejneru a vrátí
+    (selections, počty) - nevybraný filtr má v selections None.
+    `on_change(sloupec)` se volá po změně výběru filtru.
+    """
+    # Možnosti každého filtru závisí na výběru ostatních, proto se nejdřív
+    # přečte výběr všech filtrů z předchozího rerunu
+    selections = {col: st.session_state.get(f"{key_prefix}_{col}") or None for col, _ in FACETS}
+    counts = facet_counts(df, date_from, date_to, selections, text_mask)
+
+    for col, label in FACETS:
+        col_counts = counts[col]
+        available = col_counts[col_counts > 0]
+        selected = selections[col] or []
+        # Vybraná hodnota zůstává v nabídce, i když už nic nenajde
+        options = list(available.index) + [v for v in selected if v not in available.index]
+        values = st.multiselect(
+            label,
+            options,
+            key=f"{key_prefix}_{col}",
+            placeholder=f"Vše ({len(available)})",
+            format_func=lambda v, c=col_counts: f"{v} ({c.get(v, 0)})",
+            on_change=on_change,
+            args=(col,)
+        )
+        selections[col] = values or None
+    return selections, counts
@@ -0,0 +1,124 @@
+"""
+Grafy dashboardu sestavené z vyfiltrované kostky počtů (`core.cube.CubeView`).
+
+Používá je `Dashboard.py` i dávkové zpracování (`core.batch`), takže PDF
+z příkazové řádky obsahuje stejné grafy jako dashboard.
+"""
+import plotly.express as px
+
+from core.heatmap import DEFAULT_TOP_N, SORT_OPTIONS, heatmap_figure, top_rows
+
+
+def fehler_popis_figure(view):
+    fehler_counts = view.counts("Fehler Popis")
+    return px.bar(
+        fehler_counts.head(10),
+        x="Pocet",
+        y="Fehler Popis",
+        orientation="h",
+        title="Top 10 Fehler Popis",
+        height=400
+    )
+
+
+def fehler_kod_figure(view):
+    fig = px.pie(
+        view.counts("Fehler").head(10),
+        names="Fehler",
+        values="Pocet",
+        title="Top 10 Fehler kód",
+        height=500
+    )
+    fig.update_traces(textinfo='value+percent', textposition='inside')
+    return fig
+
+
+def zarizeni_figure(view):
+    fig = px.pie(
+        view.counts("Zarizeni").head(5),
+        names="Zarizeni",
+        values="Pocet",
+        title="Top 5 Zařízení",
+        height=500
+    )
+    fig.update_traces(textinfo='value+percent', textposition='inside')
+    return fig
+
+
+def pareto_table(view, column="Storort Popis"):
+    """Počty podle `column` sestupně s kumulativním podílem v procentech."""
+    pareto = view.counts(column)
+    pareto["Kumulativní %"] = pareto["Pocet"].cumsum() / pareto["Pocet"].sum() * 100
+    return pareto
+
+
+def storort_pareto_figure(view):
+    pareto_storort = pareto_table(view)
+    fig = px.bar(
+        pareto_storort,
+        x="Storort Popis",
+        y="Pocet",
+        title="Pareto analýza dle Storort Bezeichnung"
+    )
+    fig.add_scatter(
+        x=pareto_storort["Storort Popis"],
+        y=pareto_storort["Kumulativní %"],
+        mode="lines+markers",
+        name="Kumulativní %",
+        yaxis="y2"
+    )
+    fig.update_layout(
+        yaxis=dict(title="Počet"),
+        yaxis2=dict(title="Kumulativní %", overlaying="y", side="right", range=[0, 100]),
+        legend=dict(x=0.8, y=1.15),
+        height=500
+    )
+    return fig
+
+
+def storort_figure(view):
+    return px.bar(
+        view.counts("Storort Popis").head(10),
+        x="Pocet",
+        y="Storort Popis",
+        orientation="h",
+        title="Top 10 Storort Bezeichnung",
+        height=400
+    )
+
+
+def daily_figure(view):
+    return px.line(view.daily(), x="Datum", y="Pocet", title="Počet chyb v čase")
+
+
+def linie_figure(view):
+    return px.bar(
+        view.counts("Linie"),
+        x="Linie",
+        y="Pocet",
+        title="Počet chyb dle Linie"
+    )
+
+
+def dashboard_figures(view, heatmap_rows=DEFAULT_TOP_N, heatmap_sort=SORT_OPTIONS[0]):
+    """
+    Všechny grafy dashboardu jako seznam dvojic (název, figure) v pořadí
+    stránky; heatmapa obsahuje prvních `heatmap_rows` PPlatz podle
+    `heatmap_sort`.
+    """
+    figures = [
+        ("Top 10 Fehler Popis", fehler_popis_figure(view)),
+        ("Top 10 Fehler kód", fehler_kod_figure(view)),
+        ("Top 5 Zařízení", zarizeni_figure(view)),
+        ("Pareto analýza dle Storort Bezeichnung", storort_pareto_figure(view)),
+        ("Top 10 Storort Bezeichnung", storort_figure(view)),
+        ("Počet chyb v čase", daily_figure(view)),
+        ("Počet chyb dle Linie", linie_figure(view)),
+    ]
+    matrix = view.matrix("PPlatz", "Linie", require="Fehler")
+    if len(matrix):
+        figures.append((
+            "Heatmapa četnosti chyb podle PPlatz a Linie",
+            heatmap_figure(top_rows(matrix, heatmap_sort, heatmap_rows), "PPlatz", "Linie")
+        ))
+    return figures
@@ -0,0 +1,143 @@
+"""
+Společný stav filtrů všech stránek a cache vyfiltrovaných dat.
+
+Výběr filtrů (období, fulltext, fasety) se drží jednou za relaci
+v session_state pod STATE_KEY. Streamlit stav widgetů při přechodu na
+jinou stránku zahazuje, proto se widgety filtrů při každém běhu (před
+vykreslením) plní ze společného stavu. Zpět se hodnota zapisuje jen
+z `on_change` widgetu - výchozí hodnota nově vytvořeného widgetu tak
+společný stav nikdy nepřepíše a přechod mezi stránkami filtry nezmění.
+
+Vyfiltrovaná data se cachují pro každý dataset pod podpisem filtru
+(`core.filters.filter_signature`), takže stránka se stejnými filtry jako
+předchozí dostane hotový výsledek bez nového výběru řádků.
+"""
+from collections import OrderedDict
+
+import numpy as np
+import streamlit as st
+
+from core.facets import FACETS, facet_filters
+from core.filters import filter_signature, get_filter_index
+from core.memo import lru_get, per_dataset
+from core.search import TEXT_COLUMNS, get_text_index, query_terms
+
+# Klíč společného stavu filtrů v session_state a prefix klíčů jeho widgetů
+STATE_KEY = "filtry"
+WIDGET_PREFIX = "filtr"
+
+# Počet vyfiltrovaných pohledů držených pro jeden dataset
+VIEW_MEMO_SIZE = 4
+
+
+class FilterView:
+    """Výsledek filtru nad jedním datasetem (sdílený, nesmí se měnit)."""
+
+    def __init__(self, df, date_from, date_to, selections, text):
+        self.date_from = date_from
+        self.date_to = date_to
+        self.selections = selections
+        self.query = query_terms(text)
+        self.signature = filter_signature(date_from, date_to, selections, query=self.query)
+
+        positions = get_filter_index(df).select(date_from, date_to, selections)
+        # Fulltextový dotaz je maska řádků z invertovaného indexu
+        text_mask = get_text_index(df).search(text)
+        if text_mask is not None:
+            positions = positions[text_mask[positions]]
+        self.positions = positions
+        # Bez omezení se vrací celý dataset, ne jeho kopie
+        self.df = df if len(positions) == len(df) else df.iloc[positions]
+        self.text_mask = text_mask
+        self.n_rows = len(df)
+        self._row_mask = None
+
+    @property
+    def row_mask(self):
+        """Maska vyfiltrovaných řádků v pořadí datasetu (počítá se při prvním použití)."""
+        if self._row_mask is None:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            mask[self.positions] = True
+            self._row_mask = mask
+        return self._row_mask
+
+
+def _state(df):
+    """Společný stav filtrů relace; po změně datasetu začíná znovu od výchozích hodnot."""
+    dataset = st.session_state.get("dataset")
+    dataset_key = dataset.key if dataset is not None else None
+    state = st.session_state.get(STATE_KEY)
+    if state is None or state["dataset"] != dataset_key:
+        state = {
+            "dataset": dataset_key,
+            "od": df["Datum"].min().date(),
+            "do": df["Datum"].max().date(),
+            "text": "",
+            "selections": {col: None for col, _ in FACETS},
+        }
+        st.session_state[STATE_KEY] = state
+    return state
+
+
+def _widget_key(name):
+    return f"{WIDGET_PREFIX}_{name}"
+
+
+def _fill_widgets(state):
+    """Nastaví hodnoty všech widgetů filtrů ze společného stavu (před jejich vykreslením)."""
+    for name in ("text", "od", "do"):
+        st.session_state[_widget_key(name)] = state[name]
+    for col, _ in FACETS:
+        st.session_state[_widget_key(col)] = state["selections"][col] or []
+
+
+def _store(name):
+    """`on_change` widgetu filtru: zapíše jeho novou hodnotu do společného stavu."""
+    state = st.session_state[STATE_KEY]
+    value = st.session_state[_widget_key(name)]
+    if name in ("text", "od", "do"):
+        state[name] = value
+    else:
+        # Nový slovník - dřívější výběr mohou držet spočítané pohledy
+        state["selections"] = {**state["selections"], name: value or None}
+
+
+def filter_panel(df):
+    """
+    Vykreslí filtry do postranního panelu (fulltext a expandr s obdobím
+    a fasetami) a vrátí (společný stav filtrů, počty faset).
+    """
+    state = _state(df)
+    _fill_widgets(state)
+    st.sidebar.text_input(
+        "Hledat v textu",
+        key=_widget_key("text"),
+        on_change=_store,
+        args=("text",),
+        placeholder="např. Leck, Sensor",
+        help=f"Hledá začátky slov ve sloupcích {', '.join(TEXT_COLUMNS)} bez ohledu na diakritiku a velikost písmen."
+    )
+    with st.sidebar.expander("Rozbalit filtry"):
+        st.date_input("Od", key=_widget_key("od"), on_change=_store, args=("od",))
+        st.date_input("Do", key=_widget_key("do"), on_change=_store, args=("do",))
+        # Nabídky filtrů jen s možnými hodnotami a jejich počty
+        _, counts = facet_filters(
+            df, state["od"], state["do"], get_text_index(df).search(state["text"]),
+            key_prefix=WIDGET_PREFIX, on_change=_store
+        )
+    return state, counts
+
+
+def filtered_view(df, state):
+    """
+    `FilterView` pro společný stav filtrů; stejné filtry na kterékoli
+    stránce (i v jiné relaci) vrací už spočítaný výsledek.
+    """
+    views = per_dataset(df, "filtered_views", lambda _: OrderedDict())
+    selections = state["selections"]
+    signature = filter_signature(state["od"], state["do"], selections, query=query_terms(state["text"]))
+    return lru_get(
+        views, signature,
+        lambda: FilterView(df, state["od"], state["do"], selections, state["text"]),
+        VIEW_MEMO_SIZE
+    )
@@ -0,0 +1,262 @@
+"""
+Filtrování reportu přes předpočítané bitmapy.
+
+Index se staví jednou pro každý dataset (`get_filter_index`). Výběr řádků
+je pak binární vyhledání rozsahu dat v seřazeném denním indexu a AND/OR
+bitmap jednotlivých hodnot filtrů - bez `.dt.date` a bez `isin` nad
+celým DataFrame.
+"""
+import numpy as np
+import pandas as pd
+
+from core.memo import per_dataset
+from core.schema import DATE_COLUMN
+
+# Sloupce, podle kterých filtrují postranní panely všech stránek
+FILTER_COLUMNS = ["Linie", "Fehler", "Zarizeni", "Storort Popis", "Fehler Popis"]
+
+# Do kolika bitmap se vyplatí OR; při větším výběru se maska skládá přes
+# převodní tabulku kódů
+MAX_BITMAP_OR = 16
+
+# Nechá-li nejmenší výběr nejvýš tuto část řádků, ostatní dimenze se
+# kontrolují jen na jeho pozicích (převodní tabulkou kódů) místo AND bitmap
+MAX_GATHER_FRACTION = 0.25
+
+
+class _Dimension:
+    """Kódy jedné filtrovací dimenze a cache bitmap jejích hodnot."""
+
+    def __init__(self, series, n_rows):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            values = series.cat.categories
+        else:
+            codes, values = pd.factorize(series)
+        self.codes = codes.astype(np.int32, copy=False)
+        self.values = pd.Index(values)
+        self.n_rows = n_rows
+        self.has_nulls = bool((self.codes < 0).any())
+        self._bitmaps = {}
+        self._value_counts = None
+        self._last_selection = None
+
+    def bitmap(self, code):
+        """Zabalená bitmapa řádků s danou hodnotou (-1 = prázdná hodnota)."""
+        bitmap = self._bitmaps.get(code)
+        if bitmap is None:
+            bitmap = np.packbits(self.codes == code)
+            self._bitmaps[code] = bitmap
+        return bitmap
+
+    def selects_all(self, codes, include_null):
+        """Vyhovují výběru všechny řádky (nic se nevyřazuje)?"""
+        return len(codes) == len(self.values) and (include_null or not self.has_nulls)
+
+    def selected_rows(self, codes, include_null):
+        """Počet řádků celého datasetu, které vyhovují výběru."""
+        if self._value_counts is None:
+            # Na pozici 0 prázdné hodnoty (kód -1)
+            self._value_counts = np.bincount(self.codes + 1, minlength=len(self.values) + 1)
+        return int(self._value_counts[codes + 1].sum()) + (int(self._value_counts[0]) if include_null else 0)
+
+    def lookup(self, codes, include_null):
+        """Převodní tabulka kód -> vyhovuje (poslední prvek pro kód -1)."""
+        lookup = np.zeros(len(self.values) + 1, dtype=bool)
+        lookup[codes] = True
+        lookup[-1] = include_null
+        return lookup
+
+    def selection_codes(self, values):
+        """Kódy vybraných hodnot a příznak, zda výběr obsahuje prázdnou hodnotu."""
+        key = tuple(values)
+        if self._last_selection is not None and self._last_selection[0] == key:
+            return self._last_selection[1]
+        values = pd.Index(list(key), dtype=object)
+        nulls = values.isna()
+        codes = self.values.get_indexer(values[~nulls])
+        result = np.unique(codes[codes >= 0]), bool(nulls.any())
+        # Při rerunu se stejnými filtry se převod hodnot na kódy neopakuje
+        self._last_selection = (key, result)
+        return result
+
+
+class FilterIndex:
+    """
+    Index pro rychlé filtrování jednoho datasetu.
+
+    Obsahuje seřazený denní index (`DATE_COLUMN`) a pro každou dimenzi
+    z `columns` kódy hodnot, ze kterých se líně staví a cachují bitmapy
+    řádků jednotlivých hodnot.
+    """
+
+    def __init__(self, df, columns=FILTER_COLUMNS):
+        self.n_rows = len(df)
+        days = df[DATE_COLUMN].to_numpy(dtype="datetime64[D]")
+        if len(days) and not (days[1:] >= days[:-1]).all():
+            # Data nejsou seřazená podle dne - index pracuje v seřazeném pořadí
+            self._order = np.argsort(days, kind="stable")
+            days = days[self._order]
+        else:
+            self._order = None
+        self.days = days
+        self.dimensions = {}
+        self._last_facets = None
+        for col in columns:
+            series = df[col] if self._order is None else df[col].iloc[self._order]
+            self.dimensions[col] = _Dimension(series, self.n_rows)
+
+    def date_range(self, date_from, date_to):
+        """Rozsah pozic [lo, hi) v seřazeném indexu pro dny od-do včetně."""
+        lo = int(np.searchsorted(self.days, np.datetime64(date_from, "D"), side="left"))
+        hi = int(np.searchsorted(self.days, np.datetime64(date_to, "D"), side="right"))
+        return lo, max(lo, hi)
+
+    def _dimension_bits(self, dim, values, lo_byte, hi_byte):
+        """Zabalená bitmapa řádků v bajtovém rozsahu, které vyhovují výběru."""
+        codes, include_null = dim.selection_codes(values)
+        n_values = len(dim.values)
+
+        if dim.selects_all(codes, include_null):
+            return None
+        if len(codes) == n_values:
+            # Vybráno vše kromě prázdných hodnot
+            return ~dim.bitmap(-1)[lo_byte:hi_byte]
+
+        complement = len(codes) > n_values / 2
+        if complement:
+            codes = np.setdiff1d(np.arange(n_values), codes)
+        if len(codes) > MAX_BITMAP_OR:
+            lookup = dim.lookup(codes, include_null != complement)
+            part = np.zeros((hi_byte - lo_byte) * 8, dtype=bool)
+            start = lo_byte * 8
+            part[: min(self.n_rows, hi_byte * 8) - start] = lookup[dim.codes[start:hi_byte * 8]]
+            bits = np.packbits(part)
+        else:
+            bits = np.zeros(hi_byte - lo_byte, dtype=np.uint8)
+            for code in codes:
+                np.bitwise_or(bits, dim.bitmap(code)[lo_byte:hi_byte], out=bits)
+            if include_null != complement and dim.has_nulls:
+                np.bitwise_or(bits, dim.bitmap(-1)[lo_byte:hi_byte], out=bits)
+        return ~bits if complement else bits
+
+    def select(self, date_from, date_to, selections=None):
+        """
+        Pozice řádků (pro `DataFrame.iloc`) vyhovujících filtru.
+
+        `selections` je slovník {sloupec: vybrané hodnoty}; sloupec, který
+        ve slovníku chybí nebo má hodnotu None, se nefiltruje.
+
+        Dimenze, ve kterých je vybráno vše, se přeskočí a ostatní se
+        průnikují od nejmenšího výběru. Když ten nechá jen malou část
+        řádků, další dimenze se kontrolují jen na jeho pozicích.
+        """
+        lo, hi = self.date_range(date_from, date_to)
+        if lo == hi:
+            return np.empty(0, dtype=np.intp)
+
+        active = []
+        for col, values in (selections or {}).items():
+            if values is None:
+                continue
+            dim = self.dimensions[col]
+            codes, include_null = dim.selection_codes(values)
+            if not dim.selects_all(codes, include_null):
+                active.append((dim.selected_rows(codes, include_null), col, values))
+        active.sort(key=lambda item: item[0])
+
+        if not active:
+            positions = np.arange(lo, hi)
+        else:
+            lo_byte, hi_byte = lo // 8, (hi + 7) // 8
+            mask_bits = self._dimension_bits(self.dimensions[active[0][1]], active[0][2], lo_byte, hi_byte)
+            gather = active[0][0] <= MAX_GATHER_FRACTION * self.n_rows
+            if not gather:
+                for _, col, values in active[1:]:
+                    bits = self._dimension_bits(self.dimensions[col], values, lo_byte, hi_byte)
+                    np.bitwise_and(mask_bits, bits, out=mask_bits)
+            offset = lo - lo_byte * 8
+            mask = np.unpackbits(mask_bits, count=offset + hi - lo)[offset:].view(bool)
+            positions = np.flatnonzero(mask) + lo
+            if gather:
+                for _, col, values in active[1:]:
+                    dim = self.dimensions[col]
+                    positions = positions[dim.lookup(*dim.selection_codes(values))[dim.codes[positions]]]
+
+        if self._order is not None:
+            positions = np.sort(self._order[positions])
+        return positions
+
+    def facet_counts(self, date_from, date_to, selections=None, weights=None, row_mask=None):
+        """
+        Počty pro každou hodnotu každé dimenze při výběru ostatních dimenzí
+        (vlastní výběr dimenze se neuplatní) jako {sloupec: Series}.
+
+        Bitmapa výběru každé dimenze se spočítá jednou a pro každou dimenzi
+        se AND-ují jen bitmapy ostatních. `weights` jsou váhy řádků (např.
+        počty v buňkách kostky), `row_mask` další maska řádků v pořadí
+        datasetu (fulltext). Prázdné hodnoty se nepočítají.
+        """
+        key = filter_signature(date_from, date_to, selections)
+        last = self._last_facets
+        if last is not None and last[0] == key and last[1] is weights and last[2] is row_mask:
+            return last[3]
+        arguments = (key, weights, row_mask)
+
+        lo, hi = self.date_range(date_from, date_to)
+        lo_byte, hi_byte = lo // 8, (hi + 7) // 8
+        offset = lo - lo_byte * 8
+        bits = {}
+        for col, values in (selections or {}).items():
+            if values is None or lo == hi:
+                continue
+            dim_bits = self._dimension_bits(self.dimensions[col], values, lo_byte, hi_byte)
+            if dim_bits is not None:
+                bits[col] = dim_bits
+        if self._order is not None:
+            # Maska a váhy jsou v pořadí datasetu, index v seřazeném pořadí
+            row_mask = None if row_mask is None else row_mask[self._order]
+            weights = None if weights is None else weights[self._order]
+
+        result = {}
+        for col, dim in self.dimensions.items():
+            others = [dim_bits for other, dim_bits in bits.items() if other != col]
+            if others:
+                mask_bits = np.bitwise_and.reduce(others) if len(others) > 1 else others[0]
+                mask = np.unpackbits(mask_bits, count=offset + hi - lo)[offset:].view(bool)
+            else:
+                mask = np.ones(hi - lo, dtype=bool)
+            if row_mask is not None:
+                mask = mask & row_mask[lo:hi]
+            codes = dim.codes[lo:hi][mask]
+            present = codes >= 0
+            row_weights = None if weights is None else weights[lo:hi][mask][present]
+            counts = np.bincount(codes[present], weights=row_weights, minlength=len(dim.values))
+            result[col] = pd.Series(counts.astype(np.int64), index=dim.values)
+        # Při rerunu se stejnými filtry se fasety nepočítají znovu
+        self._last_facets = arguments + (result,)
+        return result
+
+
+def get_filter_index(df):
+    """Vrátí (a při prvním volání postaví) FilterIndex pro daný DataFrame."""
+    return per_dataset(df, "filter_index", FilterIndex)
+
+
+def filter_signature(date_from, date_to, selections=None, query=()):
+    """
+    Kanonický, hashovatelný podpis filtru (nezávislý na pořadí hodnot).
+
+    `query` jsou slova fulltextového dotazu (`core.search.query_terms`).
+    Slouží jako klíč cache výsledků odvozených z vyfiltrovaných dat.
+    """
+    parts = []
+    for col in sorted(selections or {}):
+        values = selections[col]
+        if values is None:
+            parts.append((col, None))
+        else:
+            parts.append((col, tuple(sorted(map(str, values)))))
+    if query:
+        parts.append(("text", tuple(query)))
+    return (str(date_from), str(date_to), tuple(parts))
@@ -0,0 +1,116 @@
+"""
+Stránkovaná tabulka pro velké výběry řádků.
+
+Řazení i výřez stránky se dělají na serveru a do prohlížeče se posílá jen
+viditelná stránka. Pořadí řádků i hotové stránky se pamatují podle
+(podpis filtru, řazení, stránka).
+"""
+import math
+from collections import OrderedDict
+
+import streamlit as st
+
+from core.memo import lru_get, per_dataset
+
+PAGE_SIZES = [50, 100, 250, 1000]
+
+NO_SORT = "(bez řazení)"
+
+# Počet pamatovaných řazení a stránek pro jeden dataset
+ORDER_MEMO_SIZE = 8
+PAGE_MEMO_SIZE = 32
+
+
+def sorted_positions(df, sort_col, ascending):
+    """Pozice řádků seřazené podle sloupce (prázdné hodnoty na konci)."""
+    series = df[sort_col].reset_index(drop=True)
+    return series.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+
+
+def get_page(df, page, page_size, sort_col=None, ascending=True, dataset=None, signature=None):
+    """
+    Jedna stránka (číslováno od 1) vyfiltrovaných dat.
+
+    Pokud je zadán `dataset` a `signature`, pamatuje se pořadí řádků pro
+    dané řazení i hotová stránka.
+    """
+    start = (page - 1) * page_size
+    stop = start + page_size
+
+    def build_page():
+        if sort_col is None:
+            return df.iloc[start:stop]
+        if dataset is None:
+            order = sorted_positions(df, sort_col, ascending)
+        else:
+            order = lru_get(
+                per_dataset(dataset, "grid_orders", lambda _: OrderedDict()),
+                (signature, sort_col, ascending),
+                lambda: sorted_positions(df, sort_col, ascending),
+                ORDER_MEMO_SIZE
+            )
+        return df.iloc[order[start:stop]]
+
+    if dataset is None:
+        return build_page()
+    return lru_get(
+        per_dataset(dataset, "grid_pages", lambda _: OrderedDict()),
+        (signature, sort_col, ascending, page, page_size),
+        build_page,
+        PAGE_MEMO_SIZE
+    )
+
+
+def paginated_dataframe(df, key, dataset=None, signature=None, selectable=False):
+    """
+    Zobrazí `df` po stránkách s řazením na serveru a počtem řádků.
+
+    `key` odlišuje ovládací prvky více tabulek na jedné stránce,
+    `dataset` a `signature` zapínají paměť stránek (viz `get_page`).
+    Se `selectable` lze na stránce vybrat jeden řádek; vrací se jeho
+    index (label v `df`), jinak None.
+    """
+    n_rows = len(df)
+    col_sort, col_dir, col_size, col_page = st.columns([3, 2, 2, 2])
+    with col_sort:
+        sort_col = st.selectbox("Řadit podle", [NO_SORT] + df.columns.tolist(), key=f"{key}_sort")
+    with col_dir:
+        descending = st.checkbox("Sestupně", key=f"{key}_desc")
+    with col_size:
+        page_size = st.selectbox("Řádků na stránku", PAGE_SIZES, index=1, key=f"{key}_size")
+    n_pages = max(1, math.ceil(n_rows / page_size))
+    page_key = f"{key}_page"
+    # Po zúžení filtru nesmí zůstat vybraná neexistující stránka
+    if st.session_state.get(page_key, 1) > n_pages:
+        st.session_state[page_key] = n_pages
+    with col_page:
+        page = int(st.number_input("Stránka", min_value=1, max_value=n_pages, step=1, key=page_key))
+
+    first = (page - 1) * page_size + 1 if n_rows else 0
+    last = min(page * page_size, n_rows)
+    st.caption(f"Řádky {first}–{last} z {n_rows} (strana {page}/{n_pages})")
+
+    page_df = get_page(
+        df,
+        page,
+        page_size,
+        sort_col=None if sort_col == NO_SORT else sort_col,
+        ascending=not descending,
+        dataset=dataset,
+        signature=(key, signature)
+    )
+    if not selectable:
+        st.dataframe(page_df, width="stretch")
+        return None
+    event = st.dataframe(
+        page_df,
+        width="stretch",
+        on_select="rerun",
+        selection_mode="single-row",
+        key=f"{key}_table"
+    )
+    rows = event.selection.rows
+    # Výběr z předchozí (jiné) stránky už nemusí existovat
+    if rows and rows[0] < len(page_df):
+        return page_df.index[rows[0]]
+    return None
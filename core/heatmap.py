@@ -0,0 +1,109 @@
+"""
+Heatmapa počtů (např. PPlatz x Linie) jako jeden Plotly graf.
+
+Matice počtů se skládá z buněk kostky (`core.cube`) a pamatuje se podle
+podpisu filtru. Do prohlížeče jde jen jedna matice čísel pro zvolených
+N řádků - cena nezávisí na počtu HTML buněk jako u pandas Styleru.
+"""
+from collections import OrderedDict
+
+import streamlit as st
+
+from core.memo import lru_get, per_dataset
+
+SORT_OPTIONS = ["Celkem (sestupně)", "Celkem (vzestupně)", "Podle názvu"]
+
+DEFAULT_TOP_N = 50
+
+# Počet pamatovaných matic pro jeden dataset
+MATRIX_MEMO_SIZE = 8
+
+# Výška jednoho řádku heatmapy v pixelech
+ROW_HEIGHT = 18
+MIN_HEIGHT = 300
+
+
+def count_matrix(cube_view, index, columns, require=None, dataset=None, signature=None):
+    """
+    Matice počtů `index` x `columns` z buněk kostky.
+
+    Pokud je zadán `dataset` a `signature`, matice se pamatuje pro daný
+    filtr a při rerunu se znovu neskládá.
+    """
+    def build():
+        return cube_view.matrix(index, columns, require=require)
+
+    if dataset is None:
+        return build()
+    return lru_get(
+        per_dataset(dataset, "heatmap_matrices", lambda _: OrderedDict()),
+        (signature, index, columns, require),
+        build,
+        MATRIX_MEMO_SIZE
+    )
+
+
+def top_rows(matrix, sort=SORT_OPTIONS[0], top_n=DEFAULT_TOP_N):
+    """Řádky matice seřazené podle `sort` a oříznuté na prvních `top_n`."""
+    if sort == "Podle názvu":
+        ordered = matrix.sort_index()
+    else:
+        totals = matrix.sum(axis=1)
+        ascending = sort == "Celkem (vzestupně)"
+        ordered = matrix.loc[totals.sort_values(ascending=ascending, kind="stable").index]
+    return ordered.head(top_n) if top_n else ordered
+
+
+def heatmap_figure(matrix, index_label, columns_label):
+    """Plotly heatmapa matice počtů (první řádek nahoře)."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Heatmap(
+        z=matrix.to_numpy(),
+        x=[str(v) for v in matrix.columns],
+        y=[str(v) for v in matrix.index],
+        colorscale="YlOrRd",
+        hovertemplate=f"{index_label}: %{{y}}<br>{columns_label}: %{{x}}<br>Počet: %{{z}}<extra></extra>"
+    ))
+    fig.update_layout(
+        xaxis=dict(title=columns_label, type="category"),
+        yaxis=dict(title=index_label, type="category", autorange="reversed"),
+        height=max(MIN_HEIGHT, ROW_HEIGHT * len(matrix) + 150)
+    )
+    return fig
+
+
+def count_heatmap(cube_view, index, columns, key, require=None, dataset=None, signature=None):
+    """
+    Zobrazí heatmapu počtů s volbou řazení a počtu řádků a vrátí její
+    figure (None, pokud nejsou data).
+
+    `key` odlišuje ovládací prvky více heatmap na jedné stránce.
+    """
+    matrix = count_matrix(cube_view, index, columns, require=require, dataset=dataset, signature=signature)
+    n_rows = len(matrix)
+    max_top = max(1, n_rows)
+    top_key = f"{key}_top"
+    # Výchozí počet řádků; po zúžení filtru nesmí zůstat vybráno víc
+    # řádků, než matice má
+    if st.session_state.get(top_key, DEFAULT_TOP_N) > max_top:
+        st.session_state[top_key] = max_top
+    elif top_key not in st.session_state:
+        st.session_state[top_key] = DEFAULT_TOP_N
+    col_sort, col_top = st.columns(2)
+    with col_sort:
+        sort = st.selectbox("Řadit řádky", SORT_OPTIONS, key=f"{key}_sort")
+    with col_top:
+        top_n = int(st.number_input(
+            f"Počet řádků ({index})", min_value=1, max_value=max_top,
+            step=10, key=top_key
+        ))
+    if not n_rows:
+        st.info("Pro zvolené filtry nejsou žádná data.")
+        return None
+
+    shown = top_rows(matrix, sort, top_n)
+    st.caption(f"Zobrazeno {len(shown)} z {n_rows} hodnot {index}")
+    fig = heatmap_figure(shown, index, columns)
+    st.plotly_chart(fig, width="stretch")
+    return fig
@@ -0,0 +1,370 @@
+"""
+Načítání Excel reportu výjezdů do oprav.
+
+Všechny stránky otevírají report přes `open_report`, který soubor zparsuje
+jen jednou - výsledek se drží ve sdílené paměti datasetů
+(`core.registry`) a v diskové cache (`core.cache.ParquetCache`) pod
+hashem obsahu souboru.
+
+Nahrát lze víc souborů najednou a z každého sešitu se čtou všechny listy
+s rozložením reportu. Jediný list se čte po blocích; víc listů se parsuje
+souběžně v procesech (`get_parse_pool`) a výsledky se spojí do jednoho
+datasetu se sloupcem `core.schema.SOURCE_COLUMN` (soubor, případně
+"soubor / list").
+
+Dashboard parsuje nový soubor na pozadí (`start_report`): `ReportJob`
+čte report ve vlákně, hlásí průběh a už načtené části dává k dispozici
+pro náhled. Po dokončení uloží dataset do obou cache, takže následné
+`open_report` už neparsuje.
+"""
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+
+from core.cache import ParquetCache
+from core.reader import frame_from_chunks, iter_report_chunks, read_report_streaming, read_sheet, sheet_names
+from core.registry import get_registry
+from core.schema import SCHEMA_VERSION, SOURCE_COLUMN, compact_frame
+from core.search import with_text_index
+
+# Menší bloky než při synchronním čtení - častější průběh, náhled a možnost zrušení
+BACKGROUND_CHUNK_SIZE = 5_000
+
+# Počet procesů pro souběžné parsování listů (výchozí počet jader)
+PARSE_WORKERS = int(os.environ.get("EXCEL_ANALYZE_PARSE_WORKERS", "0")) or os.cpu_count() or 1
+
+_hash_by_file_id = OrderedDict()
+_disk_cache = None
+_parse_pool = None
+_pool_lock = threading.Lock()
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def read_report(source):
+    """
+    Zparsuje Excel report (první list, hlavička na druhém řádku).
+
+    Používá proudové čtení (`core.reader`), aby špička paměti nezávisela
+    na velikosti sešitu.
+    """
+    return read_report_streaming(source)
+
+
+def content_hash(data):
+    """Hash obsahu souboru, který slouží jako klíč cache."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_key(uploaded_file):
+    """
+    Klíč cache pro nahraný soubor. Hash se počítá jen jednou pro každé
+    nahrání (Streamlit přiděluje každému nahrání vlastní `file_id`).
+    """
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id is not None and file_id in _hash_by_file_id:
+        return _hash_by_file_id[file_id]
+    key = content_hash(uploaded_file.getvalue())
+    if file_id is not None:
+        _hash_by_file_id[file_id] = key
+        while len(_hash_by_file_id) > 64:
+            _hash_by_file_id.popitem(last=False)
+    return key
+
+
+def get_disk_cache():
+    global _disk_cache
+    if _disk_cache is None:
+        _disk_cache = ParquetCache()
+    return _disk_cache
+
+
+def get_parse_pool():
+    """
+    Sdílený pool procesů pro parsování listů. Procesy se spouští metodou
+    "spawn" - fork procesu s vlákny Streamlitu není bezpečný.
+    """
+    global _parse_pool
+    with _pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _parse_pool
+
+
+def report_tasks(sources):
+    """
+    Listy k parsování ze `sources` [(název souboru, obsah)] jako seznam
+    (obsah, list, zdroj); zdrojem je název souboru, u sešitu s více listy
+    "soubor / list".
+    """
+    tasks = []
+    for name, data in sources:
+        try:
+            sheets = sheet_names(data)
+        except (zipfile.BadZipFile, KeyError):
+            # Neznámá struktura sešitu - chybu ohlásí až openpyxl u prvního listu
+            sheets = []
+        if len(sheets) <= 1:
+            tasks.append((data, 0, name))
+        else:
+            tasks.extend((data, sheet, f"{name} / {sheet}") for sheet in sheets)
+    return tasks
+
+
+def iter_report_parts(tasks, chunk_size=BACKGROUND_CHUNK_SIZE, progress=None, parallel=True):
+    """
+    Postupně vrací části reportu z `tasks` (viz `report_tasks`) se sloupcem
+    SOURCE_COLUMN. Jediný list se čte po blocích v tomto vlákně
+    a `progress(přečteno, celkem)` počítá řádky listu. Víc listů se
+    parsuje souběžně v `get_parse_pool` (listy bez rozložení reportu se
+    přeskočí), části jsou celé listy v pořadí dokončení a `progress`
+    počítá listy. Po zavření generátoru se nezačaté listy zruší.
+
+    S `parallel=False` se listy parsují postupně v tomto procesu - pro
+    volání z pracovního procesu jiného poolu (např. `core.batch`).
+    """
+    if len(tasks) == 1:
+        data, sheet, source = tasks[0]
+        for chunk in iter_report_chunks(BytesIO(data), chunk_size, progress=progress, sheet=sheet):
+            yield chunk.assign(**{SOURCE_COLUMN: source})
+        return
+
+    if not parallel:
+        for done, (data, sheet, source) in enumerate(tasks, 1):
+            part = read_sheet(data, sheet, source)
+            if progress is not None:
+                progress(done, len(tasks))
+            if part is not None:
+                yield part
+        return
+
+    pool = get_parse_pool()
+    futures = [pool.submit(read_sheet, data, sheet, source) for data, sheet, source in tasks]
+    try:
+        for done, future in enumerate(as_completed(futures), 1):
+            part = future.result()
+            if progress is not None:
+                progress(done, len(futures))
+            if part is not None:
+                yield part
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _parse_cached(key, sources, parallel=True):
+    """Zparsuje `sources` [(název, obsah)], pokud už nejsou v diskové cache pod `key`."""
+    disk_cache = get_disk_cache()
+    df = disk_cache.get(key)
+    if df is None:
+        parts = iter_report_parts(report_tasks(sources), parallel=parallel)
+        df = compact_frame(frame_from_chunks(list(parts)))
+        disk_cache.put(key, df)
+    else:
+        # Parquet neuchová categorical u číselných kódů (např. Fehler)
+        df = compact_frame(df)
+    return df
+
+
+def _sources_key(keys_and_names):
+    """Klíč cache pro soubory [(hash obsahu, název)]; název je součástí sloupce zdroje."""
+    key = content_hash("\n".join(f"{k}:{name}" for k, name in keys_and_names).encode("utf-8"))
+    return f"{key}-v{SCHEMA_VERSION}"
+
+
+def uploaded_files(uploaded):
+    """Seznam nahraných souborů z `st.file_uploader` (jeden soubor i seznam)."""
+    if uploaded is None:
+        return []
+    return list(uploaded) if isinstance(uploaded, (list, tuple)) else [uploaded]
+
+
+def report_key(uploaded):
+    """Klíč cache a sdílené paměti pro nahraný soubor nebo soubory."""
+    return _sources_key([(file_key(f), getattr(f, "name", None)) for f in uploaded_files(uploaded)])
+
+
+def _report_label(files):
+    names = [getattr(f, "name", None) or "soubor" for f in files]
+    return names[0] if len(names) == 1 else f"{len(names)} souborů"
+
+
+def _uploaded_sources(files):
+    return [(getattr(f, "name", None) or "soubor", f.getvalue()) for f in files]
+
+
+def load_report_file(path, parallel=True):
+    """
+    Načte report (všechny listy) ze souboru na disku (bez Streamlitu) přes
+    stejnou diskovou cache jako `open_report`. S `parallel=False` se listy
+    parsují v tomto procesu (viz `iter_report_parts`).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    name = os.path.basename(path)
+    return _parse_cached(_sources_key([(content_hash(data), name)]), [(name, data)], parallel=parallel)
+
+
+def open_report(uploaded):
+    """
+    Vrátí handle (`core.registry.DatasetHandle`) na normalizovaný DataFrame
+    v úsporném schématu (`core.schema.compact_frame`) pro nahraný soubor
+    nebo seznam souborů.
+
+    Excel se parsuje pouze tehdy, když daný obsah není ve sdílené paměti
+    ani v diskové cache. Relace si ukládá handle, ne samotný DataFrame.
+    """
+    files = uploaded_files(uploaded)
+    key = report_key(files)
+    return get_registry().open(
+        key,
+        lambda: with_text_index(_parse_cached(key, _uploaded_sources(files))),
+        label=_report_label(files)
+    )
+
+
+class ReportJob:
+    """
+    Parsování nahraných souborů ve vlákně (listy souběžně přes
+    `iter_report_parts`).
+
+    Stav (`rows`, `read`, `total`, `done`, `error`) čtou relace při každém
+    rerunu; `read`/`total` jsou řádky listu, nebo listy, je-li `sheets`
+    víc než 1. `partial()` vrací dosud načtené řádky v úsporném schématu.
+
+    Jeden job sdílí všechny relace, které nahrály stejný obsah; zastaví se,
+    až ho poslední z nich uvolní (`release`).
+    """
+
+    def __init__(self, key, sources, label=None):
+        self.key = key
+        self.label = label
+        self.rows = 0
+        self.read = 0
+        self.total = None
+        self.sheets = None
+        self.error = None
+        self.started = time.monotonic()
+        # Počet relací, které job používají (mění se pod `_jobs_lock`)
+        self._users = 0
+        self._sources = sources
+        self._chunks = []
+        self._partial = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"report-{key[:12]}", daemon=True)
+        self._thread.start()
+
+    @property
+    def done(self):
+        return self._finished.is_set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """Zastaví parsování po dočtení aktuálního bloku."""
+        self._cancel.set()
+
+    def release(self):
+        """Relace job už nepotřebuje; bez dalších relací se parsování zastaví."""
+        with _jobs_lock:
+            self._users -= 1
+            if self._users <= 0:
+                self.cancel()
+
+    def _progress(self, read, total):
+        self.read, self.total = read, total
+
+    def _run(self):
+        chunks = None
+        try:
+            tasks = report_tasks(self._sources)
+            self.sheets = len(tasks)
+            chunks = iter_report_parts(tasks, progress=self._progress)
+            for chunk in chunks:
+                if self._cancel.is_set():
+                    return
+                self._chunks.append(chunk)
+                self.rows += len(chunk)
+            if self._cancel.is_set():
+                return
+            df = compact_frame(frame_from_chunks(self._chunks))
+            get_disk_cache().put(self.key, df)
+            # Dataset zůstane ve sdílené paměti pro `open_report`
+            get_registry().open(self.key, lambda: with_text_index(df), label=self.label)
+        except Exception as exc:
+            self.error = exc
+        finally:
+            if chunks is not None:
+                chunks.close()
+            self._sources = None
+            self._chunks = []
+            self._partial = None
+            with _jobs_lock:
+                if _jobs.get(self.key) is self:
+                    del _jobs[self.key]
+            self._finished.set()
+
+    def fraction(self):
+        """Podíl přečtených řádků listu (0-1), nebo None bez odhadu celku."""
+        if not self.total:
+            return None
+        return min(self.read / self.total, 1.0)
+
+    def remaining_seconds(self):
+        """Odhad zbývajícího času podle dosavadní rychlosti, nebo None."""
+        fraction = self.fraction()
+        if not fraction:
+            return None
+        elapsed = time.monotonic() - self.started
+        return elapsed * (1 - fraction) / fraction
+
+    def partial(self):
+        """Dosud načtené řádky (`compact_frame`), nebo None před prvním blokem."""
+        chunks = list(self._chunks)
+        if not chunks:
+            return None
+        # Náhled se skládá znovu, jen když přibyl blok
+        if self._partial is None or self._partial[0] != len(chunks):
+            self._partial = (len(chunks), compact_frame(frame_from_chunks(chunks)))
+        return self._partial[1]
+
+
+def start_report(uploaded, previous=None):
+    """
+    `ReportJob` pro nahraný soubor nebo soubory, nebo None, pokud je obsah
+    už ve sdílené paměti či v diskové cache (pak stačí `open_report`).
+
+    Běžící job stejného obsahu (rerun, jiná relace) se použije znovu.
+    Job předchozího souboru relace (`previous`) relace uvolní - zastaví se,
+    jen pokud ho nepoužívá jiná relace. Neúspěch se neopakuje, dokud se
+    nenahraje jiný soubor.
+    """
+    files = uploaded_files(uploaded)
+    key = report_key(files)
+    if previous is not None:
+        if previous.key == key:
+            if previous.error is not None or not (previous.done or previous.cancelled):
+                # Rerun stejné relace - job už má započtený
+                return previous
+        else:
+            previous.release()
+    if key in get_registry() or key in get_disk_cache():
+        return None
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is None or job.cancelled:
+            job = ReportJob(key, _uploaded_sources(files), label=_report_label(files))
+            _jobs[key] = job
+        job._users += 1
+    return job
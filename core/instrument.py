@@ -0,0 +1,178 @@
+"""
+Volitelné měření výkonu jednotlivých fází stránek.
+
+Měření se zapíná přepínačem v panelu "Měření výkonu" v postranním panelu
+(nebo proměnnou prostředí EXCEL_ANALYZE_PROFILE=1). Pro každou fázi
+označenou `with stage("nazev"):` se zaznamená čas a změna paměti procesu
+(RSS) a záznam se připíše do JSON-lines logu spolu s id session, stránkou
+a počtem řádků datasetu. Vypnuté měření nic nestojí - modul nenačítá
+pandas, aby nezdržoval první vykreslení stránky bez dat.
+
+Rerun jen fragmentu nevolá `begin_run`; funkce fragmentu označená
+`measured` proto začne vlastní běh (`begin_fragment`) s novým id a časem
+startu a záznamy nesou jméno fragmentu a id běhu stránky (`parent`).
+"""
+import datetime
+import functools
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from core.paths import DEFAULT_STORE_DIR
+
+LOG_PATH = os.environ.get(
+    "EXCEL_ANALYZE_PROFILE_LOG",
+    os.path.join(DEFAULT_STORE_DIR, "profile.jsonl")
+)
+
+ENABLED_BY_ENV = os.environ.get("EXCEL_ANALYZE_PROFILE", "") not in ("", "0")
+
+# Klíče v session_state
+_TOGGLE_KEY = "instrument_enabled"
+_RUN_KEY = "_instrument_run"
+
+
+def _rss_bytes():
+    """Aktuální RSS procesu v bajtech, nebo None, pokud ho systém nehlásí."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def enabled():
+    return ENABLED_BY_ENV or bool(st.session_state.get(_TOGGLE_KEY, False))
+
+
+def _session_id():
+    if "_instrument_session" not in st.session_state:
+        st.session_state["_instrument_session"] = uuid.uuid4().hex[:12]
+    return st.session_state["_instrument_session"]
+
+
+def begin_run(page):
+    """Začátek rerunu stránky `page` - volá se hned po `st.set_page_config`."""
+    st.session_state[_RUN_KEY] = {
+        "run": uuid.uuid4().hex[:12],
+        "page": page,
+        "rows": None,
+        "started": time.perf_counter(),
+        "stages": [],
+    }
+
+
+def _fragment_rerun():
+    """Běží jen fragment, ne celá stránka?"""
+    ctx = get_script_run_ctx()
+    return bool(getattr(ctx, "fragment_ids_this_run", None))
+
+
+def begin_fragment(name):
+    """
+    Začátek rerunu fragmentu `name`: nový běh se stránkou a počtem řádků
+    z posledního běhu stránky.
+    """
+    page_run = st.session_state.get(_RUN_KEY) or {}
+    st.session_state[_RUN_KEY] = {
+        "run": uuid.uuid4().hex[:12],
+        "page": page_run.get("page"),
+        "rows": page_run.get("rows"),
+        "fragment": name,
+        "parent": page_run.get("parent") or page_run.get("run"),
+        "started": time.perf_counter(),
+        "stages": [],
+    }
+
+
+def set_rows(n_rows):
+    """Počet řádků datasetu, ke kterému se vztahují další záznamy."""
+    run = st.session_state.get(_RUN_KEY)
+    if run is not None:
+        run["rows"] = int(n_rows)
+
+
+def _append_log(record):
+    try:
+        os.makedirs(os.path.dirname(LOG_PATH), exist_ok=True)
+        with open(LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        # Log je jen pomůcka - jeho chyba nesmí shodit stránku
+        pass
+
+
+@contextmanager
+def stage(name):
+    """Změří blok kódu jako fázi `name` (při vypnutém měření nic nedělá)."""
+    run = st.session_state.get(_RUN_KEY)
+    if run is None or not enabled():
+        yield
+        return
+
+    rss_before = _rss_bytes()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        rss_after = _rss_bytes()
+        delta_mb = None
+        if rss_before is not None and rss_after is not None:
+            delta_mb = round((rss_after - rss_before) / 1024 / 1024, 2)
+        entry = {"Fáze": name, "Sekundy": round(seconds, 4), "Paměť Δ (MB)": delta_mb}
+        run["stages"].append(entry)
+        _append_log({
+            "time": datetime.datetime.now().isoformat(timespec="milliseconds"),
+            "session": _session_id(),
+            "run": run["run"],
+            "parent": run.get("parent"),
+            "fragment": run.get("fragment"),
+            "page": run["page"],
+            "rows": run["rows"],
+            "stage": name,
+            "seconds": entry["Sekundy"],
+            "mem_delta_mb": delta_mb,
+        })
+
+
+def measured(name):
+    """
+    Dekorátor: celé volání funkce se měří jako fáze `name`. Při rerunu
+    jen fragmentu začne vlastní běh (`begin_fragment`).
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _fragment_rerun():
+                begin_fragment(name)
+            with stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def render_panel():
+    """
+    Panel "Měření výkonu" v postranním panelu s přepínačem a fázemi
+    posledního rerunu. Volá se na konci stránky.
+    """
+    run = st.session_state.get(_RUN_KEY)
+    with st.sidebar.expander("Měření výkonu"):
+        st.toggle("Měřit fáze stránky", key=_TOGGLE_KEY, disabled=ENABLED_BY_ENV)
+        if not enabled() or run is None:
+            st.caption("Měření je vypnuté.")
+            return
+        total = time.perf_counter() - run["started"]
+        rows = f", {run['rows']} řádků" if run["rows"] is not None else ""
+        st.caption(f"Rerun {run['run']}: {total:.3f} s{rows}")
+        if run["stages"]:
+            import pandas as pd
+
+            st.dataframe(pd.DataFrame(run["stages"]), width="stretch", hide_index=True)
+        st.caption(f"Log: {LOG_PATH}")
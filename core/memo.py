@@ -0,0 +1,101 @@
+"""
+Objekty odvozené z datasetu (indexy, kostky), postavené jen jednou.
+
+Datasety i odvozené objekty sdílí všechny relace (vlákna serveru), proto
+se slovníky mění jen pod zámkem. Stavba objektu (`build`) běží mimo
+společný zámek; pro jeden dataset a jméno se staví nejvýše jednou.
+"""
+import threading
+import weakref
+
+_derived = {}
+_lock = threading.Lock()
+
+
+def per_dataset(df, name, build):
+    """
+    Vrátí `build(df)` uložený pod jménem `name` pro daný DataFrame.
+
+    Výsledek se drží, dokud existuje DataFrame, ze kterého vznikl.
+    """
+    with _lock:
+        entry = _derived.get(id(df))
+        if entry is None or entry[0]() is not df:
+            ref = weakref.ref(df, lambda _, key=id(df): _derived.pop(key, None))
+            # (odkaz na dataset, odvozené objekty, zámky jejich stavby)
+            entry = (ref, {}, {})
+            _derived[id(df)] = entry
+        derived, build_locks = entry[1], entry[2]
+        if name in derived:
+            return derived[name]
+        build_lock = build_locks.setdefault(name, threading.Lock())
+
+    with build_lock:
+        if name not in derived:
+            derived[name] = build(df)
+        return derived[name]
+
+
+def lru_get(memo, key, build, size):
+    """
+    Hodnota z `memo` (OrderedDict) pod klíčem `key`; chybějící se spočítá
+    přes `build()` a nejdéle nepoužité položky nad `size` se zahodí.
+
+    Souběžné volání může stejnou hodnotu spočítat dvakrát; uloží se
+    a vrátí ta první.
+    """
+    with _lock:
+        value = memo.get(key)
+        if value is not None:
+            memo.move_to_end(key)
+            return value
+
+    value = build()
+    with _lock:
+        existing = memo.get(key)
+        if existing is not None:
+            memo.move_to_end(key)
+            return existing
+        memo[key] = value
+        while len(memo) > size:
+            memo.popitem(last=False)
+    return value
+
+
+def derived_bytes(df):
+    """
+    Přibližná velikost objektů odvozených z `df` (indexy, memo tabulek,
+    obrázky) v bajtech; samotný `df` se nepočítá. DataFrame se měří bez
+    obsahu textových objektů (`deep=False`).
+    """
+    # numpy a pandas až tady - modul načítají i stránky bez dat
+    import numpy as np
+    import pandas as pd
+
+    entry = _derived.get(id(df))
+    if entry is None or entry[0]() is not df:
+        return 0
+    # list() kopíruje slovník naráz (pod GIL) - jiné vlákno ho může měnit
+    stack = list(entry[1].values())
+    seen = {id(df)}
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, pd.DataFrame):
+            total += int(obj.memory_usage(deep=False).sum())
+        elif isinstance(obj, (pd.Series, pd.Index)):
+            total += int(obj.memory_usage(deep=False))
+        elif isinstance(obj, np.ndarray):
+            total += obj.nbytes
+        elif isinstance(obj, (bytes, bytearray)):
+            total += len(obj)
+        elif isinstance(obj, dict):
+            stack.extend(list(obj.values()))
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+        elif hasattr(obj, "__dict__"):
+            stack.extend(list(vars(obj).values()))
+    return total
@@ -0,0 +1,20 @@
+"""
+Výchozí adresáře aplikace (lze přepsat proměnnými prostředí).
+
+Modul nic dalšího nenačítá, takže ho mohou importovat i části, které běží
+při prvním vykreslení stránky bez dat (měření výkonu).
+"""
+import os
+import tempfile
+
+# Trvalé úložiště reportů a log měření
+DEFAULT_STORE_DIR = os.environ.get(
+    "EXCEL_ANALYZE_STORE_DIR",
+    os.path.join(os.path.expanduser("~"), ".excel_analyze")
+)
+
+# Disková cache zparsovaných reportů a exportů
+DEFAULT_CACHE_DIR = os.environ.get(
+    "EXCEL_ANALYZE_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "excel_analyze_cache")
+)
@@ -0,0 +1,186 @@
+"""
+Export grafů dashboardu do PDF.
+
+Grafy se převádějí na PNG přes kaleido paralelně ve sdíleném poolu procesů
+a hotové obrázky se pamatují podle podpisu filtru a obsahu grafu, takže
+opakovaný export nezměněného pohledu nic znovu nekreslí. PDF se skládá
+v paměti s fontem DejaVu (české znaky) a celé se pamatuje také.
+"""
+import copy
+import hashlib
+import importlib.util
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from core.memo import lru_get, per_dataset
+
+FONT_FAMILY = "DejaVu"
+FONT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "DejaVuSansCondensed.ttf")
+
+# Rozměry PNG obrázku grafu v pixelech
+IMAGE_WIDTH = 1200
+IMAGE_HEIGHT = 650
+
+# Nejvýše tolik procesů kreslí grafy současně
+MAX_WORKERS = 4
+
+# Počet pamatovaných obrázků a hotových PDF pro jeden dataset
+IMAGE_MEMO_SIZE = 64
+PDF_MEMO_SIZE = 4
+
+_render_pool = None
+_font_template = None
+_font_data = None
+_lock = threading.Lock()
+
+
+class PdfExportError(RuntimeError):
+    """Export do PDF nelze provést (např. chybí kaleido)."""
+
+
+def _render_png(fig_json, width, height):
+    """Převod jednoho grafu (JSON) na PNG - běží v pracovním procesu."""
+    import plotly.io as pio
+
+    return pio.from_json(fig_json).to_image(format="png", width=width, height=height)
+
+
+def get_render_pool():
+    """
+    Sdílený pool procesů pro kreslení grafů. Procesy se spouští metodou
+    "spawn" (fork procesu s vlákny Streamlitu není bezpečný) a zůstávají
+    běžet, takže start kaleida se platí jen jednou na proces.
+    """
+    global _render_pool
+    with _lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(
+                max_workers=min(MAX_WORKERS, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _render_pool
+
+
+def render_images(figures, dataset=None, signature=None):
+    """
+    PNG obrázky pro seznam dvojic (název, JSON grafu) ve stejném pořadí.
+
+    Chybějící obrázky se kreslí paralelně v `get_render_pool`; při
+    zadaném `dataset` se hotové obrázky pamatují podle (podpis filtru,
+    název, obsah grafu).
+    """
+    if importlib.util.find_spec("kaleido") is None:
+        raise PdfExportError("Pro export grafů do PDF je potřeba nainstalovat balíček kaleido.")
+
+    memo = OrderedDict() if dataset is None else per_dataset(dataset, "pdf_images", lambda _: OrderedDict())
+    keys, jobs, rendered = [], {}, {}
+    for title, fig_json in figures:
+        key = (signature, title, hashlib.sha1(fig_json.encode("utf-8")).hexdigest())
+        keys.append(key)
+        # Obrázek si podržíme - jiná relace ho mezitím může z memo vytlačit
+        png = memo.get(key)
+        if png is None:
+            jobs[key] = fig_json
+        else:
+            rendered[key] = png
+
+    try:
+        if len(jobs) == 1:
+            (key, fig_json), = jobs.items()
+            rendered[key] = _render_png(fig_json, IMAGE_WIDTH, IMAGE_HEIGHT)
+        elif jobs:
+            pool = get_render_pool()
+            futures = {
+                key: pool.submit(_render_png, fig_json, IMAGE_WIDTH, IMAGE_HEIGHT)
+                for key, fig_json in jobs.items()
+            }
+            try:
+                rendered.update((key, future.result()) for key, future in futures.items())
+            finally:
+                for future in futures.values():
+                    future.cancel()
+    except (ValueError, RuntimeError, OSError) as e:
+        raise PdfExportError(f"Grafy se nepodařilo převést na obrázky: {e}") from e
+
+    return [lru_get(memo, key, lambda: rendered[key], IMAGE_MEMO_SIZE) for key in keys]
+
+
+def _new_document():
+    """
+    Nový prázdný dokument s fontem DejaVu.
+
+    fpdf2 neumí načíst metriky z přiložených `.pkl` souborů, proto se TTF
+    zparsuje jednou za proces do vzorového dokumentu a každé PDF dostane
+    jeho kopii. Tabulky fontu (`ttfont`) fpdf2 při výstupu ořezává na
+    použité znaky, takže každá kopie je otevírá znovu z bytes v paměti.
+    """
+    from fontTools import ttLib
+    from fpdf import FPDF
+
+    global _font_template, _font_data
+    with _lock:
+        if _font_template is None:
+            template = FPDF(orientation="L", unit="mm", format="A4")
+            template.set_auto_page_break(False)
+            template.add_font(FONT_FAMILY, "", FONT_PATH)
+            with open(FONT_PATH, "rb") as f:
+                _font_data = f.read()
+            _font_template = template
+        pdf = copy.deepcopy(_font_template)
+    for font in pdf.fonts.values():
+        font.ttfont = ttLib.TTFont(BytesIO(_font_data), recalcTimestamp=False, lazy=True)
+    return pdf
+
+
+def build_pdf(title, subtitle, sections):
+    """
+    Sestaví PDF v paměti a vrátí ho jako bytes.
+
+    `sections` je seznam dvojic (nadpis, PNG bytes), každá na vlastní stránce.
+    """
+    pdf = _new_document()
+    width = pdf.w - pdf.l_margin - pdf.r_margin
+
+    pdf.add_page()
+    pdf.set_font(FONT_FAMILY, size=20)
+    pdf.cell(width, 12, title, new_x="LMARGIN", new_y="NEXT")
+    pdf.set_font(FONT_FAMILY, size=11)
+    pdf.multi_cell(width, 6, subtitle)
+
+    for heading, png in sections:
+        pdf.add_page()
+        pdf.set_font(FONT_FAMILY, size=14)
+        pdf.cell(width, 10, heading, new_x="LMARGIN", new_y="NEXT")
+        pdf.image(BytesIO(png), x=pdf.l_margin, w=width, h=width * IMAGE_HEIGHT / IMAGE_WIDTH)
+    return bytes(pdf.output())
+
+
+def dashboard_pdf(figures, title, subtitle, dataset=None, signature=None):
+    """
+    PDF se všemi grafy z `figures` (seznam dvojic (název, figure)).
+
+    Při zadaném `dataset` se hotové PDF pamatuje podle podpisu filtru
+    a obsahu grafů.
+    """
+    payloads = [(name, fig.to_json()) for name, fig in figures]
+
+    def build():
+        images = render_images(payloads, dataset=dataset, signature=signature)
+        return build_pdf(title, subtitle, [(name, png) for (name, _), png in zip(payloads, images)])
+
+    if dataset is None:
+        return build()
+    content = hashlib.sha1()
+    for name, fig_json in payloads:
+        content.update(name.encode("utf-8"))
+        content.update(fig_json.encode("utf-8"))
+    return lru_get(
+        per_dataset(dataset, "pdf_reports", lambda _: OrderedDict()),
+        (signature, title, subtitle, content.hexdigest()),
+        build,
+        PDF_MEMO_SIZE
+    )
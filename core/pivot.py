@@ -0,0 +1,174 @@
+"""
+Kontingenční tabulky počítané jedním průchodem groupby.
+
+Buňky i součtový řádek (margins) se odvozují ze stejných součtů a počtů
+za skupiny, výsledky se pamatují podle podpisu filtru a zvolených sloupců
+a velikost výstupu je omezená, aby sloupec s mnoha hodnotami (Komentar,
+Fab Nr) nevyrobil obří tabulku.
+"""
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core.aggregate import numeric_view
+from core.memo import lru_get, per_dataset
+
+AGGREGATIONS = ["count", "sum", "mean"]
+
+TOTAL_LABEL = "Celkem"
+
+# Limity velikosti výsledné tabulky
+MAX_PIVOT_COLUMNS = 2_000
+MAX_PIVOT_CELLS = 2_000_000
+
+# Počet pivotů pamatovaných pro jeden dataset
+PIVOT_MEMO_SIZE = 16
+
+
+class PivotConfigError(ValueError):
+    """Zvolené osy nebo hodnoty pivot neumožňují spočítat."""
+
+
+class PivotTooLarge(PivotConfigError):
+    """Zvolené osy by vytvořily příliš velkou tabulku."""
+
+
+def _distinct_groups(df, cols):
+    """Počet různých kombinací hodnot ve sloupcích `cols`."""
+    if not cols:
+        return 1
+    bound = int(np.prod([df[col].nunique(dropna=True) for col in cols], dtype=float))
+    if len(cols) == 1 or bound <= MAX_PIVOT_COLUMNS:
+        return bound
+    return df.groupby(cols, observed=True).ngroups
+
+
+def check_pivot_size(df, index_cols, columns_cols, n_value_columns):
+    """Vyhodí PivotTooLarge, pokud by tabulka překročila limity."""
+    n_columns = _distinct_groups(df, columns_cols) * max(n_value_columns, 1)
+    if n_columns > MAX_PIVOT_COLUMNS:
+        raise PivotTooLarge(
+            f"Tabulka by měla {n_columns} sloupců (limit {MAX_PIVOT_COLUMNS}). "
+            "Zvol pro sloupce méně detailní pole nebo zužte filtry."
+        )
+    n_rows = _distinct_groups(df, index_cols)
+    if n_rows * n_columns > MAX_PIVOT_CELLS:
+        raise PivotTooLarge(
+            f"Tabulka by měla {n_rows} řádků x {n_columns} sloupců (limit {MAX_PIVOT_CELLS} buněk). "
+            "Zvol méně detailní pole nebo zužte filtry."
+        )
+
+
+def _combine(counts, sums, values_cols, aggs):
+    """Sloupce (value, agg) z počtů a součtů za skupiny."""
+    parts = {}
+    for val in values_cols:
+        for agg in aggs:
+            if agg == "count":
+                parts[(val, agg)] = counts[val]
+            elif val in sums:
+                parts[(val, agg)] = sums[val] if agg == "sum" else sums[val] / counts[val]
+    if isinstance(counts, pd.Series):
+        return pd.Series(parts, dtype=float).rename_axis([None, None])
+    return pd.DataFrame(parts, index=counts.index)
+
+
+def _empty_pivot(index_cols, columns_cols, values_cols, numeric_cols, aggs):
+    """Prázdná tabulka a nulové součty se stejnými úrovněmi jako `compute_pivot`."""
+    if columns_cols:
+        # Bez řádků neexistuje žádná kombinace hodnot columns
+        pairs = []
+    else:
+        pairs = [(val, agg) for val in values_cols for agg in aggs if agg == "count" or val in numeric_cols]
+    columns = pd.MultiIndex.from_tuples(pairs, names=[None, None] + columns_cols)
+    if len(index_cols) > 1:
+        index = pd.MultiIndex.from_tuples([], names=index_cols)
+    else:
+        index = pd.Index([], name=index_cols[0])
+    return pd.DataFrame(index=index, columns=columns, dtype=float), pd.Series(0.0, index=columns)
+
+
+def compute_pivot(df, index_cols, columns_cols, values_cols, aggs):
+    """
+    Spočítá kontingenční tabulku a její součtový řádek.
+
+    Vrací (tabulka, součty), kde tabulka má sloupce (value, agg, *columns)
+    a součty jsou Series se stejnými sloupci. Sum/mean se počítají jen pro
+    číselné hodnoty (kódy v categorical sloupcích se převedou na čísla).
+    """
+    index_cols = list(index_cols)
+    columns_cols = [col for col in columns_cols if col not in index_cols]
+    keys = index_cols + columns_cols
+    values_cols = [col for col in values_cols if col not in keys]
+    aggs = [agg for agg in AGGREGATIONS if agg in aggs]
+    if not index_cols:
+        raise PivotConfigError("Pro index je potřeba zvolit alespoň jeden sloupec.")
+    if not values_cols or not aggs:
+        raise PivotConfigError("Zvol alespoň jednu hodnotu (mimo index a columns) a jednu agregaci.")
+
+    check_pivot_size(df, index_cols, columns_cols, len(values_cols) * len(aggs))
+
+    source = df[keys].copy()
+    for col in values_cols:
+        source[col] = numeric_view(df[col])
+    numeric_cols = [col for col in values_cols if pd.api.types.is_numeric_dtype(source[col])]
+    if source.empty:
+        return _empty_pivot(index_cols, columns_cols, values_cols, numeric_cols, aggs)
+
+    # Jediný průchod: počty a součty za skupiny (groupby nad kódy categorical)
+    grouped = source.groupby(keys, observed=True, sort=True)
+    counts = grouped[values_cols].count()
+    sums = grouped[numeric_cols].sum() if numeric_cols and ({"sum", "mean"} & set(aggs)) else {}
+
+    table = _combine(counts, sums, values_cols, aggs)
+    if columns_cols:
+        # Součty přes řádky pro každou kombinaci columns - ze stejných skupin
+        level_counts = counts.groupby(level=columns_cols, observed=True).sum()
+        level_sums = sums.groupby(level=columns_cols, observed=True).sum() if len(sums) else {}
+        totals = _combine(level_counts, level_sums, values_cols, aggs).unstack(columns_cols)
+        table = table.unstack(columns_cols, fill_value=0)
+        # Úrovně sloupců jako běžné hodnoty (categorical úrovně neprojdou přes Arrow)
+        table.columns = pd.MultiIndex.from_tuples(table.columns.tolist(), names=table.columns.names)
+        totals = totals.reindex(table.columns)
+    else:
+        totals = _combine(counts.sum(), sums.sum() if len(sums) else {}, values_cols, aggs)
+    return table.fillna(0), totals.fillna(0)
+
+
+def with_margins(table, totals):
+    """Tabulka s připojeným řádkem TOTAL_LABEL (jediná kopie dat)."""
+    # Úrovně indexu jako text - číselná úroveň s TOTAL_LABEL neprojde přes Arrow
+    if isinstance(table.index, pd.MultiIndex):
+        rows = [tuple(str(v) for v in row) for row in table.index.tolist()]
+        rows.append(tuple([TOTAL_LABEL] * table.index.nlevels))
+        index = pd.MultiIndex.from_tuples(rows, names=table.index.names)
+    else:
+        index = pd.Index([str(v) for v in table.index] + [TOTAL_LABEL], name=table.index.name)
+    total_row = pd.DataFrame([totals.to_numpy()], columns=table.columns)
+    return pd.concat([table, total_row], ignore_index=True).set_axis(index)
+
+
+def cached_pivot(dataset, signature, df_filtered, index_cols, columns_cols, values_cols, aggs, margins):
+    """
+    Pivot pro vyfiltrovaná data s pamětí výsledků.
+
+    Klíčem je (podpis filtru, index, columns, values, agregace) v rámci
+    datasetu `dataset`; přepnutí margins nic nepřepočítává.
+    """
+    def build():
+        table, totals = compute_pivot(df_filtered, index_cols, columns_cols, values_cols, aggs)
+        return {"table": table, "totals": totals}
+
+    entry = lru_get(
+        per_dataset(dataset, "pivot_memo", lambda _: OrderedDict()),
+        (signature, tuple(index_cols), tuple(columns_cols), tuple(values_cols), tuple(aggs)),
+        build,
+        PIVOT_MEMO_SIZE
+    )
+
+    if not margins:
+        return entry["table"]
+    if "with_margins" not in entry:
+        entry["with_margins"] = with_margins(entry["table"], entry["totals"])
+    return entry["with_margins"]
@@ -0,0 +1,146 @@
+"""
+Proudové čtení velkých Excel reportů.
+
+`pd.read_excel` nejdřív načte celý list do seznamu Python hodnot a teprve
+potom staví DataFrame. Zde se list čte po blocích řádků přes openpyxl
+v režimu read-only, takže v paměti je vždy jen jeden blok surových hodnot
+a již hotové typované sloupce.
+
+Sešit může mít víc listů (např. list za linku); `sheet_names` je zjistí
+bez načtení sešitu a `read_sheet` zparsuje jeden list - je na úrovni
+modulu, aby šel spustit v procesu z `core.ingest`.
+"""
+import re
+import zipfile
+from io import BytesIO
+
+import pandas as pd
+
+from core.schema import COLUMN_NAMES, SOURCE_COLUMN
+
+# Výchozí počet řádků v jednom bloku
+DEFAULT_CHUNK_SIZE = 20_000
+
+# Řádek s hlavičkou (odpovídá `header=1` v `pd.read_excel`)
+HEADER_ROW = 2
+
+
+def _column_names(header):
+    """Názvy sloupců: sloupec 0 podle hlavičky, 1..13 podle COLUMN_NAMES."""
+    names = []
+    for i, value in enumerate(header):
+        if 1 <= i <= len(COLUMN_NAMES):
+            names.append(COLUMN_NAMES[i - 1])
+        elif value is None:
+            names.append(f"Unnamed: {i}")
+        else:
+            names.append(str(value))
+    return names
+
+
+def _is_report_header(header):
+    """Hlavička má rozložení reportu: sloupec `Datum` a většinu pojmenovaných sloupců."""
+    named = header[1:len(COLUMN_NAMES) + 1]
+    if len(named) < len(COLUMN_NAMES) or named[0] is None:
+        return False
+    return sum(value is not None for value in named) * 2 >= len(COLUMN_NAMES)
+
+
+def sheet_names(data):
+    """Názvy listů sešitu (obsah xlsx) v pořadí sešitu, bez načtení sešitu."""
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        workbook = archive.read("xl/workbook.xml").decode("utf-8")
+    return [
+        name.replace("&amp;", "&").replace("&lt;", "<").replace("&gt;", ">").replace("&quot;", '"').replace("&apos;", "'")
+        for name in re.findall(r'<(?:\w+:)?sheet\b[^>]*?\bname="([^"]*)"', workbook)
+    ]
+
+
+def _build_chunk(rows, columns):
+    """Převede blok řádků na DataFrame s odvozenými typy sloupců."""
+    width = len(columns)
+    # Řádky v read-only režimu mohou mít různou délku - zarovnáme je
+    rows = [
+        row if len(row) == width else (row + (None,) * width)[:width]
+        for row in rows
+    ]
+    chunk = pd.DataFrame.from_records(rows, columns=columns)
+    return chunk.infer_objects()
+
+
+def iter_report_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE, progress=None, sheet=0, strict=False):
+    """
+    Postupně vrací bloky reportu jako DataFrame s přejmenovanými sloupci.
+
+    Řádky bez `Datum` se zahazují už při čtení. `source` je cesta nebo
+    binární file-like objekt, `sheet` index nebo název listu. Se `strict`
+    se list bez rozložení reportu (`_is_report_header`) přeskočí.
+    `progress(přečteno, celkem)` se volá před každým blokem s počtem
+    přečtených řádků listu a jejich odhadem podle rozměru listu (None,
+    pokud ho sešit neuvádí).
+    """
+    # openpyxl se načítá až s prvním čteným souborem, ne při startu aplikace
+    from openpyxl import load_workbook
+
+    wb = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+    try:
+        ws = wb.worksheets[sheet] if isinstance(sheet, int) else wb[sheet]
+        rows = ws.iter_rows(min_row=HEADER_ROW, values_only=True)
+        header = next(rows, None)
+        if header is None or (strict and not _is_report_header(header)):
+            return
+        # Prázdné sloupce na konci hlavičky nepatří do dat
+        while len(header) > len(COLUMN_NAMES) + 1 and header[-1] is None:
+            header = header[:-1]
+        columns = _column_names(header)
+        datum_pos = columns.index("Datum")
+        total = ws.max_row - HEADER_ROW if ws.max_row else None
+
+        chunk = []
+        read = 0
+        for row in rows:
+            read += 1
+            if len(row) <= datum_pos or row[datum_pos] is None:
+                continue
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                if progress is not None:
+                    progress(read, total)
+                yield _build_chunk(chunk, columns)
+                chunk = []
+        if progress is not None:
+            progress(read, read)
+        if chunk:
+            yield _build_chunk(chunk, columns)
+    finally:
+        wb.close()
+
+
+def read_report_streaming(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Načte celý report po blocích. Výsledek odpovídá `pd.read_excel(...,
+    header=1)` s přejmenovanými sloupci (COLUMN_NAMES), bez řádků bez data
+    a s `Datum` jako datetime, ale špička paměti je dána velikostí bloku
+    a výsledného DataFrame, ne velikostí sešitu.
+    """
+    return frame_from_chunks(list(iter_report_chunks(source, chunk_size=chunk_size)))
+
+
+def read_sheet(data, sheet, source, strict=True):
+    """
+    Jeden list sešitu (obsah xlsx) jako DataFrame se sloupcem SOURCE_COLUMN
+    = `source`, nebo None, pokud list nemá rozložení reportu či je prázdný.
+    """
+    chunks = list(iter_report_chunks(BytesIO(data), sheet=sheet, strict=strict))
+    if not chunks:
+        return None
+    return frame_from_chunks(chunks).assign(**{SOURCE_COLUMN: source})
+
+
+def frame_from_chunks(chunks):
+    """Spojí bloky z `iter_report_chunks` do jednoho DataFrame s `Datum` jako datetime."""
+    if not chunks:
+        return pd.DataFrame(columns=["Unnamed: 0"] + COLUMN_NAMES)
+    df = pd.concat(chunks, ignore_index=True)
+    df["Datum"] = pd.to_datetime(df["Datum"])
+    return df
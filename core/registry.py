@@ -0,0 +1,160 @@
+"""
+Sdílená paměť datasetů pro všechny relace (sessions) prohlížeče.
+
+Každý dataset se v procesu drží jen jednou pod klíčem obsahu (hash
+nahraného souboru, období z úložiště). Relace si v session_state ukládají
+jen `DatasetHandle` a DataFrame si berou přes `handle.df`, takže stejný
+report otevřený v mnoha oknech zabírá paměť jednou. DataFrame je sdílený
+a jen pro čtení - nikdo ho nesmí měnit na místě.
+
+Datasety, na které už žádná relace nedrží handle, zůstávají v paměti pro
+další otevření, dokud celková velikost nepřekročí rozpočet
+(EXCEL_ANALYZE_MEMORY_BUDGET_MB, výchozí 2048). Do velikosti se počítají
+i objekty odvozené z datasetu (`core.memo`: indexy, memo pivotů, stránek
+tabulky a obrázků). Pak se uvolňují od nejdéle nepoužitého - odvozené
+objekty zaniknou s DataFrame. Datasety s živým handlem se neuvolňují nikdy.
+"""
+import datetime
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+from core.memo import derived_bytes
+
+DEFAULT_BUDGET_MB = 2048
+
+MEMORY_BUDGET_MB = float(os.environ.get("EXCEL_ANALYZE_MEMORY_BUDGET_MB", DEFAULT_BUDGET_MB))
+
+_registry = None
+
+
+class DatasetHandle:
+    """Odkaz relace na sdílený dataset; dokud existuje, dataset se neuvolní."""
+
+    def __init__(self, registry, key):
+        self.key = key
+        self._registry = registry
+        weakref.finalize(self, registry._release, key)
+
+    @property
+    def df(self):
+        return self._registry.get(self.key)
+
+
+class DatasetRegistry:
+    """Datasety procesu pod klíčem obsahu s rozpočtem paměti a LRU uvolňováním."""
+
+    def __init__(self, budget_mb=MEMORY_BUDGET_MB):
+        self.budget_bytes = int(budget_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks = {}
+
+    def open(self, key, load, label=None):
+        """
+        Vrátí handle na dataset `key`. Chybí-li v paměti, načte se přes
+        `load()` - při souběžných požadavcích na stejný klíč jen jednou.
+        """
+        # Zámek klíče se zahodí, až na něm nikdo nečeká - jinak by po
+        # chybě `load()` další vlákno dostalo nový zámek a načítalo souběžně
+        with self._lock:
+            key_lock = self._key_locks.get(key)
+            if key_lock is None:
+                key_lock = self._key_locks[key] = {"lock": threading.Lock(), "waiters": 0}
+            key_lock["waiters"] += 1
+        try:
+            with key_lock["lock"]:
+                with self._lock:
+                    if key in self._entries:
+                        return self._acquire(key)
+                df = load()
+                now = datetime.datetime.now()
+                with self._lock:
+                    self._entries[key] = {
+                        "df": df,
+                        "label": label or key[:12],
+                        "bytes": int(df.memory_usage(deep=True).sum()),
+                        "refs": 0,
+                        "loaded": now,
+                        "used": now,
+                    }
+                    handle = self._acquire(key)
+                    self._evict()
+                    return handle
+        finally:
+            with self._lock:
+                key_lock["waiters"] -= 1
+                if key_lock["waiters"] == 0:
+                    del self._key_locks[key]
+
+    def _acquire(self, key):
+        entry = self._entries[key]
+        entry["refs"] += 1
+        entry["used"] = datetime.datetime.now()
+        self._entries.move_to_end(key)
+        return DatasetHandle(self, key)
+
+    def _release(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["refs"] -= 1
+                self._evict()
+
+    @staticmethod
+    def _size(entry):
+        """Velikost datasetu včetně odvozených objektů v bajtech."""
+        return entry["bytes"] + derived_bytes(entry["df"])
+
+    def _evict(self):
+        """Uvolní nejdéle nepoužité nedržené datasety, dokud se nevejde do rozpočtu."""
+        sizes = {key: self._size(entry) for key, entry in self._entries.items()}
+        total = sum(sizes.values())
+        for key in list(self._entries):
+            if total <= self.budget_bytes:
+                break
+            if self._entries[key]["refs"] == 0:
+                del self._entries[key]
+                total -= sizes[key]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def get(self, key):
+        """DataFrame datasetu `key` (KeyError, pokud už byl uvolněn)."""
+        with self._lock:
+            entry = self._entries[key]
+            entry["used"] = datetime.datetime.now()
+            self._entries.move_to_end(key)
+            return entry["df"]
+
+    def resident_mb(self):
+        with self._lock:
+            return sum(self._size(entry) for entry in self._entries.values()) / 1024 / 1024
+
+    def resident(self):
+        """Přehled datasetů v paměti od naposledy použitého."""
+        with self._lock:
+            rows = [{
+                "Dataset": entry["label"],
+                "Řádky": len(entry["df"]),
+                "MB": round(entry["bytes"] / 1024 / 1024, 2),
+                "Odvozené MB": round(derived_bytes(entry["df"]) / 1024 / 1024, 2),
+                "Relací": entry["refs"],
+                "Načteno": entry["loaded"].strftime("%H:%M:%S"),
+                "Použito": entry["used"].strftime("%H:%M:%S"),
+            } for entry in reversed(self._entries.values())]
+        columns = ["Dataset", "Řádky", "MB", "Odvozené MB", "Relací", "Načteno", "Použito"]
+        return pd.DataFrame(rows, columns=columns)
+
+
+def get_registry():
+    """Sdílená instance pro celý proces."""
+    global _registry
+    if _registry is None:
+        _registry = DatasetRegistry()
+    return _registry
@@ -0,0 +1,105 @@
+"""
+Schéma reportu výjezdů do oprav.
+"""
+import pandas as pd
+
+# Názvy sloupců 1..13 reportu (sloupec 0 se nepřejmenovává)
+COLUMN_NAMES = [
+    "Datum",
+    "Linie",
+    "PPlatz",
+    "Storort",
+    "Storort Popis",
+    "Fab Nr",
+    "Material Nr",
+    "Zarizeni",
+    "Material Nr 2",
+    "Material Popis",
+    "Fehler",
+    "Fehler Popis",
+    "Komentar",
+]
+
+# Odkud řádek pochází (soubor, případně "soubor / list")
+SOURCE_COLUMN = "Zdroj"
+
+# Verze schématu - zvyšuje se při změně `compact_frame`, aby se nepoužila
+# stará data z diskové cache
+SCHEMA_VERSION = 3
+
+# Textové dimenze s malým počtem různých hodnot -> categorical
+CATEGORY_COLUMNS = [
+    "Linie",
+    "PPlatz",
+    "Storort",
+    "Storort Popis",
+    "Zarizeni",
+    "Fehler",
+    "Fehler Popis",
+    "Material Popis",
+    SOURCE_COLUMN,
+]
+
+# Čísla, která mohou chybět -> nullable integer
+INTEGER_COLUMNS = ["Fab Nr", "Material Nr"]
+
+# Normalizované datum (půlnoc daného dne) pro denní agregace
+DATE_COLUMN = "Den"
+
+# Nad tímto podílem různých hodnot se sloupec na categorical nepřevádí
+MAX_CATEGORY_RATIO = 0.5
+
+
+def _to_nullable_int(series):
+    """Převede sloupec na Int64, pokud to jde beze ztráty informace."""
+    try:
+        numeric = pd.to_numeric(series)
+    except (ValueError, TypeError):
+        return series
+    if pd.api.types.is_bool_dtype(numeric):
+        return series
+    if pd.api.types.is_float_dtype(numeric):
+        values = numeric.dropna()
+        if not (values == values.round()).all():
+            return series
+    try:
+        return numeric.astype("Int64")
+    except (ValueError, TypeError, OverflowError):
+        return series
+
+
+def compact_frame(df):
+    """
+    Převede normalizovaný report na úsporné schéma.
+
+    Dimenze z CATEGORY_COLUMNS se uloží jako categorical (filtry, value_counts
+    i pivoty pak pracují s celočíselnými kódy), INTEGER_COLUMNS jako Int64
+    a přidá se sloupec DATE_COLUMN s datem bez času. Řádky se seřadí podle
+    `Datum`, aby šlo období vybírat binárním vyhledáváním.
+    """
+    df = df.copy()
+    df["Datum"] = pd.to_datetime(df["Datum"])
+    if not df["Datum"].is_monotonic_increasing:
+        df = df.sort_values("Datum", kind="stable", ignore_index=True)
+    for col in CATEGORY_COLUMNS:
+        if col not in df.columns or isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        if len(df) and df[col].nunique() / len(df) > MAX_CATEGORY_RATIO:
+            continue
+        df[col] = df[col].astype("category")
+    for col in INTEGER_COLUMNS:
+        if col in df.columns:
+            df[col] = _to_nullable_int(df[col])
+    df[DATE_COLUMN] = df["Datum"].dt.normalize()
+    return df
+
+
+def memory_report(df):
+    """Paměť jednotlivých sloupců (v MB) včetně typu, seřazeno od největší."""
+    usage = df.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        "Sloupec": usage.index,
+        "Typ": [str(df[col].dtype) for col in usage.index],
+        "MB": usage.values / 1024 ** 2,
+    })
+    return report.sort_values("MB", ascending=False, ignore_index=True)
@@ -0,0 +1,119 @@
+"""
+Fulltextové hledání v textových sloupcích reportu.
+
+Index se staví jednou pro každý dataset (při načtení, `with_text_index`).
+Pro každý sloupec z TEXT_COLUMNS drží kódy hodnot řádků a invertovaný
+index slov: seřazený seznam slov a ke každému kódy hodnot, ve kterých se
+vyskytuje. Slova i dotaz se převádí bez diakritiky a na malá písmena
+(`fold`), takže "cidl" najde "čidla" a "strasse" najde "Straße".
+
+Každé slovo dotazu se hledá jako začátek slova v libovolném z textových
+sloupců; všechna slova dotazu musí sedět (AND). Výsledkem je maska
+řádků, která se kombinuje s pozicemi z `core.filters.FilterIndex`.
+"""
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+import pandas as pd
+
+from core.memo import per_dataset
+
+TEXT_COLUMNS = ["Komentar", "Fehler Popis", "Material Popis"]
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def fold(text):
+    """Text bez diakritiky a bez rozdílu velikosti písmen."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    """Slova textu po `fold`."""
+    return _TOKEN_RE.findall(fold(text))
+
+
+def query_terms(query):
+    """Kanonická slova dotazu (bez duplicit, seřazená) - klíč cache a podpisu filtru."""
+    return tuple(sorted(set(tokenize(query or ""))))
+
+
+class _TextColumn:
+    """Kódy hodnot jednoho textového sloupce a invertovaný index jejich slov."""
+
+    def __init__(self, series):
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            codes = series.cat.codes.to_numpy()
+            values = series.cat.categories
+        else:
+            codes, values = pd.factorize(series)
+        self.codes = codes.astype(np.int32, copy=False)
+        self.n_values = len(values)
+
+        postings = {}
+        for value_id, text in enumerate(values):
+            for token in set(tokenize(str(text))):
+                postings.setdefault(token, []).append(value_id)
+        self.tokens = sorted(postings)
+        self.postings = [np.array(postings[token], dtype=np.int32) for token in self.tokens]
+
+    def value_mask(self, term):
+        """Maska hodnot obsahujících slovo začínající na `term`; poslední prvek patří prázdné hodnotě."""
+        lo = bisect_left(self.tokens, term)
+        hi = bisect_left(self.tokens, term + "￿")
+        mask = np.zeros(self.n_values + 1, dtype=bool)
+        if hi > lo:
+            mask[np.concatenate(self.postings[lo:hi])] = True
+        return mask
+
+    def row_mask(self, term):
+        # Kód -1 (prázdná hodnota) ukazuje na poslední prvek masky, který je vždy False
+        return self.value_mask(term)[self.codes]
+
+
+class TextIndex:
+    """Invertovaný index slov textových sloupců jednoho datasetu."""
+
+    def __init__(self, df, columns=TEXT_COLUMNS):
+        self.n_rows = len(df)
+        self.columns = {col: _TextColumn(df[col]) for col in columns if col in df.columns}
+        self._last_query = None
+
+    def term_mask(self, term):
+        """Maska řádků, které mají v některém sloupci slovo začínající na `term` (po `fold`)."""
+        mask = np.zeros(self.n_rows, dtype=bool)
+        for column in self.columns.values():
+            mask |= column.row_mask(term)
+        return mask
+
+    def search(self, query):
+        """
+        Maska řádků (v pořadí datasetu) vyhovujících dotazu, nebo None pro
+        prázdný dotaz.
+        """
+        terms = query_terms(query)
+        if not terms:
+            return None
+        if self._last_query is not None and self._last_query[0] == terms:
+            return self._last_query[1]
+
+        mask = np.ones(self.n_rows, dtype=bool)
+        for term in terms:
+            mask &= self.term_mask(term)
+        # Při rerunu se stejným dotazem se maska nepočítá znovu
+        self._last_query = (terms, mask)
+        return mask
+
+
+def get_text_index(df):
+    """Vrátí (a při prvním volání postaví) TextIndex pro daný DataFrame."""
+    return per_dataset(df, "text_index", TextIndex)
+
+
+def with_text_index(df):
+    """Postaví textový index hned při načtení datasetu a vrátí `df`."""
+    get_text_index(df)
+    return df
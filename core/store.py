@@ -0,0 +1,203 @@
+"""
+Trvalé úložiště reportů (SQLite), do kterého se přidávají další reporty.
+
+Každý řádek má stabilní klíč z KEY_COLUMNS, takže opakovaně nahraný nebo
+překrývající se report nepřidá duplicity. Přidání stojí čas úměrný jen
+novým řádkům a dashboard si z úložiště načte libovolné období bez
+opětovného čtení starých souborů.
+"""
+import datetime
+import os
+import sqlite3
+from contextlib import contextmanager
+
+import pandas as pd
+
+from core.paths import DEFAULT_STORE_DIR
+from core.registry import get_registry
+from core.schema import COLUMN_NAMES, SOURCE_COLUMN, compact_frame
+from core.search import with_text_index
+
+# Sloupce, ze kterých se skládá klíč řádku pro deduplikaci
+KEY_COLUMNS = ["Datum", "Linie", "PPlatz", "Fab Nr", "Fehler"]
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_stores = {}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _key_text(value):
+    """Textová podoba hodnoty v klíči (101.0 a 101 dávají stejný klíč)."""
+    if value is None or pd.isna(value):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _key_part(series):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Převádí se jen kategorie, řádky se jen indexují kódy
+        texts = pd.Index([_key_text(v) for v in series.cat.categories] + [""])
+        return pd.Series(texts[series.cat.codes.to_numpy()], index=series.index)
+    return series.astype(object).map(_key_text)
+
+
+def row_keys(df):
+    """Stabilní klíč každého řádku (hodnoty KEY_COLUMNS spojené přes '|')."""
+    key = df["Datum"].dt.strftime(DATETIME_FORMAT)
+    for col in KEY_COLUMNS[1:]:
+        key = key + "|" + _key_part(df[col])
+    return key
+
+
+def _sql_value(value):
+    """Hodnota buňky ve tvaru, který umí uložit sqlite3."""
+    if value is None or value is pd.NA:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    if hasattr(value, "item"):
+        return value.item()
+    return value
+
+
+class ReportStore:
+    """SQLite úložiště řádků reportů v adresáři `directory`."""
+
+    def __init__(self, directory=DEFAULT_STORE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "reports.sqlite")
+        columns = ", ".join(map(_quote, [SOURCE_COLUMN] + COLUMN_NAMES))
+        with self._connect() as con:
+            con.execute(
+                f"CREATE TABLE IF NOT EXISTS incidents (row_key TEXT PRIMARY KEY, {columns}) WITHOUT ROWID"
+            )
+            con.execute('CREATE INDEX IF NOT EXISTS incidents_datum ON incidents ("Datum")')
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS sources ("
+                "source_key TEXT PRIMARY KEY, name TEXT, appended_at TEXT, new_rows INTEGER)"
+            )
+            # Revize dat v databázi - změnu vidí i ostatní procesy nad stejným souborem
+            con.execute("CREATE TABLE IF NOT EXISTS revision (id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER)")
+            con.execute("INSERT OR IGNORE INTO revision VALUES (0, 0)")
+
+    @contextmanager
+    def _connect(self):
+        """Spojení s úložištěm; na konci bloku se potvrdí a zavře."""
+        con = sqlite3.connect(self.path)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def has_source(self, source_key):
+        """Zda už byl soubor s daným hashem obsahu do úložiště přidán."""
+        with self._connect() as con:
+            row = con.execute("SELECT 1 FROM sources WHERE source_key = ?", (source_key,)).fetchone()
+        return row is not None
+
+    def append(self, df, source_key=None, source_name=None):
+        """
+        Přidá řádky reportu a vrátí počet skutečně nových řádků.
+
+        Řádky, jejichž klíč už v úložišti je, se přeskočí. Soubor se stejným
+        `source_key` (hash obsahu) se podruhé vůbec nezpracovává.
+        """
+        if source_key is not None and self.has_source(source_key):
+            return 0
+
+        # Zdroj řádku z načtení (soubor / list) má přednost před názvem celého přidání
+        sources = df[SOURCE_COLUMN].astype(object).to_numpy() if SOURCE_COLUMN in df.columns else source_name
+        data = pd.DataFrame({"row_key": row_keys(df), SOURCE_COLUMN: sources})
+        data["Datum"] = df["Datum"].dt.strftime(DATETIME_FORMAT)
+        for col in COLUMN_NAMES[1:]:
+            data[col] = df[col].astype(object) if col in df.columns else None
+        columns = ["row_key", SOURCE_COLUMN] + COLUMN_NAMES
+        placeholders = ", ".join("?" for _ in columns)
+        sql = f"INSERT OR IGNORE INTO incidents ({', '.join(map(_quote, columns))}) VALUES ({placeholders})"
+        rows = ([_sql_value(v) for v in row] for row in data[columns].itertuples(index=False, name=None))
+
+        with self._connect() as con:
+            before = con.total_changes
+            con.executemany(sql, rows)
+            new_rows = con.total_changes - before
+            if new_rows:
+                # Ve stejné transakci jako řádky
+                con.execute("UPDATE revision SET value = value + 1 WHERE id = 0")
+            if source_key is not None:
+                con.execute(
+                    "INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)",
+                    (source_key, source_name, datetime.datetime.now().isoformat(timespec="seconds"), new_rows)
+                )
+        return new_rows
+
+    @property
+    def revision(self):
+        """
+        Revize dat úložiště; zvyšuje se při každém přidání nových řádků,
+        i z jiného procesu. Je součástí klíče načtených období.
+        """
+        with self._connect() as con:
+            return con.execute("SELECT value FROM revision WHERE id = 0").fetchone()[0]
+
+    def sources(self):
+        """Přehled přidaných souborů."""
+        with self._connect() as con:
+            return pd.read_sql_query(
+                "SELECT name, appended_at, new_rows FROM sources ORDER BY appended_at", con
+            )
+
+    def date_bounds(self):
+        """Nejstarší a nejnovější den v úložišti, nebo (None, None), je-li prázdné."""
+        with self._connect() as con:
+            lo, hi = con.execute('SELECT MIN("Datum"), MAX("Datum") FROM incidents').fetchone()
+        if lo is None:
+            return None, None
+        return pd.Timestamp(lo).date(), pd.Timestamp(hi).date()
+
+    def dataset_key(self, date_from, date_to):
+        """Klíč období od-do pro sdílenou paměť datasetů (`core.registry`)."""
+        return f"store:{self.path}:{self.revision}:{date_from}:{date_to}"
+
+    def open(self, date_from, date_to):
+        """
+        Handle na řádky za dny od-do ve sdílené paměti datasetů; opakované
+        dotazy (i z jiných relací) se vrací z paměti.
+        """
+        return get_registry().open(
+            self.dataset_key(date_from, date_to),
+            lambda: with_text_index(self.load(date_from, date_to)),
+            label=f"Úložiště {date_from} - {date_to}"
+        )
+
+    def load(self, date_from, date_to):
+        """
+        Načte řádky za dny od-do (včetně) ve stejném schématu jako
+        `core.ingest.open_report`.
+        """
+        start = pd.Timestamp(date_from).strftime(DATETIME_FORMAT)
+        end = (pd.Timestamp(date_to) + pd.Timedelta(days=1)).strftime(DATETIME_FORMAT)
+        columns = ", ".join(map(_quote, [SOURCE_COLUMN] + COLUMN_NAMES))
+        with self._connect() as con:
+            df = pd.read_sql_query(
+                f'SELECT {columns} FROM incidents WHERE "Datum" >= ? AND "Datum" < ? ORDER BY "Datum"',
+                con,
+                params=(start, end)
+            )
+        df["Datum"] = pd.to_datetime(df["Datum"], format=DATETIME_FORMAT)
+        return compact_frame(df)
+
+
+def get_store(directory=DEFAULT_STORE_DIR):
+    """Sdílená instance úložiště pro daný adresář."""
+    store = _stores.get(directory)
+    if store is None:
+        store = ReportStore(directory)
+        _stores[directory] = store
+    return store
@@ -0,0 +1,165 @@
+"""
+Denní index počtů s kumulativními součty pro KPI.
+
+Pro každý den od prvního do posledního dne datasetu drží kumulativní počet
+výjezdů - celkem a zvlášť pro každou hodnotu dimenzí z TIMELINE_DIMENSIONS.
+Počet za libovolné období je rozdíl dvou prvků pole, takže srovnání
+s předchozím týdnem, měsícem či rokem i klouzavé průměry nestojí průchod
+řádky datasetu.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from core.memo import per_dataset
+from core.schema import DATE_COLUMN
+
+# Dimenze, pro které se drží počty po dnech (velikost: hodnoty x dny)
+TIMELINE_DIMENSIONS = ["Linie", "Fehler"]
+
+COUNT_COLUMN = "Pocet"
+
+# Režimy srovnání: název -> posun období (None = stejně dlouhé období těsně před)
+COMPARISONS = {
+    "Předchozí období": None,
+    "Týden proti týdnu (WoW)": pd.DateOffset(weeks=1),
+    "Měsíc proti měsíci (MoM)": pd.DateOffset(months=1),
+    "Rok proti roku (YoY)": pd.DateOffset(years=1),
+}
+
+ROLLING_WINDOWS = [7, 28]
+
+
+def comparison_period(date_from, date_to, mode):
+    """Srovnávací období (od, do) k období od-do podle režimu z COMPARISONS."""
+    offset = COMPARISONS[mode]
+    if offset is None:
+        days = (date_to - date_from).days + 1
+        prev_to = date_from - datetime.timedelta(days=1)
+        return prev_to - datetime.timedelta(days=days - 1), prev_to
+    return (pd.Timestamp(date_from) - offset).date(), (pd.Timestamp(date_to) - offset).date()
+
+
+class DailyIndex:
+    """Kumulativní denní počty jednoho datasetu, celkem i po hodnotách dimenzí."""
+
+    def __init__(self, df, dimensions=TIMELINE_DIMENSIONS):
+        days = df[DATE_COLUMN].to_numpy(dtype="datetime64[D]")
+        if len(days):
+            self.start = days.min()
+            self.n_days = int((days.max() - self.start).astype(int)) + 1
+        else:
+            self.start = np.datetime64("1970-01-01", "D")
+            self.n_days = 0
+        positions = (days - self.start).astype(np.int64)
+
+        self._total = self._cumulative(np.bincount(positions, minlength=self.n_days)[None, :])
+        self.values = {}
+        self._prefix = {}
+        for col in dimensions:
+            series = df[col]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes = series.cat.codes.to_numpy()
+                values = series.cat.categories
+            else:
+                codes, values = pd.factorize(series)
+            valid = codes >= 0
+            flat = codes[valid].astype(np.int64) * self.n_days + positions[valid]
+            counts = np.bincount(flat, minlength=len(values) * self.n_days)
+            self.values[col] = pd.Index(values).astype(object)
+            self._prefix[col] = self._cumulative(counts.reshape(len(values), self.n_days))
+
+    @staticmethod
+    def _cumulative(counts):
+        """Kumulativní součty po dnech s nulovým sloupcem na začátku."""
+        prefix = np.zeros((counts.shape[0], counts.shape[1] + 1), dtype=np.int64)
+        np.cumsum(counts, axis=1, out=prefix[:, 1:])
+        return prefix
+
+    def _bounds(self, date_from, date_to):
+        """Pozice [lo, hi) v kumulativních polích pro dny od-do včetně."""
+        lo = int((np.datetime64(date_from, "D") - self.start).astype(int))
+        hi = int((np.datetime64(date_to, "D") - self.start).astype(int)) + 1
+        lo = min(max(lo, 0), self.n_days)
+        hi = min(max(hi, 0), self.n_days)
+        return lo, max(lo, hi)
+
+    def _prefix_for(self, column):
+        return self._total if column is None else self._prefix[column]
+
+    def total(self, date_from, date_to):
+        """Počet výjezdů za dny od-do."""
+        lo, hi = self._bounds(date_from, date_to)
+        return int(self._total[0, hi] - self._total[0, lo])
+
+    def counts(self, column, date_from, date_to, label=None):
+        """
+        Počty podle dimenze za dny od-do jako DataFrame [label, "Pocet"],
+        seřazené sestupně (jako `core.cube.CubeView.counts`).
+        """
+        lo, hi = self._bounds(date_from, date_to)
+        prefix = self._prefix[column]
+        counts = pd.Series(prefix[:, hi] - prefix[:, lo], index=self.values[column])
+        counts = counts[counts > 0].sort_values(ascending=False, kind="stable")
+        return pd.DataFrame({
+            label or column: counts.index,
+            COUNT_COLUMN: counts.to_numpy(),
+        })
+
+    def compare(self, column, date_from, date_to, prev_from, prev_to):
+        """
+        Počty podle dimenze v období a ve srovnávacím období jako DataFrame
+        [column, "Pocet", "Předchozí", "Rozdíl", "Rozdíl %"].
+        """
+        lo, hi = self._bounds(date_from, date_to)
+        prev_lo, prev_hi = self._bounds(prev_from, prev_to)
+        prefix = self._prefix[column]
+        result = pd.DataFrame({
+            column: self.values[column],
+            COUNT_COLUMN: prefix[:, hi] - prefix[:, lo],
+            "Předchozí": prefix[:, prev_hi] - prefix[:, prev_lo],
+        })
+        result = result[(result[COUNT_COLUMN] > 0) | (result["Předchozí"] > 0)]
+        result["Rozdíl"] = result[COUNT_COLUMN] - result["Předchozí"]
+        result["Rozdíl %"] = (result["Rozdíl"] / result["Předchozí"].where(result["Předchozí"] > 0) * 100).round(1)
+        return result.sort_values(COUNT_COLUMN, ascending=False, kind="stable", ignore_index=True)
+
+    def _dates(self, lo, hi):
+        return pd.to_datetime(self.start + np.arange(lo, hi))
+
+    def daily(self, date_from, date_to, label="Datum"):
+        """Počty po dnech za dny od-do (včetně dnů bez výjezdů) jako DataFrame [label, "Pocet"]."""
+        lo, hi = self._bounds(date_from, date_to)
+        return pd.DataFrame({
+            label: self._dates(lo, hi),
+            COUNT_COLUMN: np.diff(self._total[0, lo:hi + 1]),
+        })
+
+    def rolling(self, date_from, date_to, window, column=None, values=None):
+        """
+        Klouzavý průměr počtu za den přes `window` dní pro každý den od-do.
+
+        Bez `column` vrátí jeden sloupec "Celkem", jinak sloupec pro každou
+        hodnotu dimenze (nebo jen pro `values`). Okno na začátku dat se
+        nepřeklápí přes první den - průměr se počítá z dnů, které existují.
+        """
+        lo, hi = self._bounds(date_from, date_to)
+        prefix = self._prefix_for(column)
+        if column is None:
+            labels = pd.Index(["Celkem"])
+            rows = np.arange(1)
+        else:
+            labels = self.values[column]
+            rows = np.arange(len(labels)) if values is None else labels.get_indexer(pd.Index(values, dtype=object))
+            rows = rows[rows >= 0]
+            labels = labels[rows]
+        ends = np.arange(lo, hi) + 1
+        starts = np.maximum(ends - window, 0)
+        sums = prefix[np.ix_(rows, ends)] - prefix[np.ix_(rows, starts)]
+        return pd.DataFrame(sums.T / (ends - starts)[:, None], index=self._dates(lo, hi), columns=labels)
+
+
+def get_daily_index(df):
+    """Vrátí (a při prvním volání postaví) DailyIndex pro daný DataFrame."""
+    return per_dataset(df, "daily_index", DailyIndex)
@@ -1,6 +1,6 @@
 import streamlit as st
-import pandas as pd
-import datetime
+
+from core.instrument import begin_run, render_panel, set_rows, stage
 
 # Nastavíme zobrazení stránky včetně ikony 📊
 st.set_page_config(
@@ -8,37 +8,25 @@ st.set_page_config(
     page_icon=":chart:",
     layout="wide"
 )
+begin_run("Kontingenční tabulka")
 
 def load_data():
     """
     Zkusí načíst `df` z session_state, nebo nechá uživatele nahrát nový soubor.
     """
-    if "df" in st.session_state:
-        return st.session_state["df"]
-    uploaded_file = st.file_uploader(
-        "Nahraj Excel (pro pokročilou pivot analýzu)", type=["xlsx"]
+    if "dataset" in st.session_state:
+        return st.session_state["dataset"].df
+    uploaded_files = st.file_uploader(
+        "Nahraj Excel (pro pokročilou pivot analýzu)", type=["xlsx"], accept_multiple_files=True
     )
-    if not uploaded_file:
+    if not uploaded_files:
         return None
-    df_raw = pd.read_excel(uploaded_file, sheet_name=0, header=1)
-    df = df_raw.rename(columns={
-        df_raw.columns[1]: "Datum",
-        df_raw.columns[2]: "Linie",
-        df_raw.columns[3]: "PPlatz",
-        df_raw.columns[4]: "Storort",
-        df_raw.columns[5]: "Storort Popis",
-        df_raw.columns[6]: "Fab Nr",
-        df_raw.columns[7]: "Material Nr",
-        df_raw.columns[8]: "Zarizeni",
-        df_raw.columns[9]: "Material Nr 2",
-        df_raw.columns[10]: "Material Popis",
-        df_raw.columns[11]: "Fehler",
-        df_raw.columns[12]: "Fehler Popis",
-        df_raw.columns[13]: "Komentar"
-    })
-    df = df.dropna(subset=["Datum"])
-    df["Datum"] = pd.to_datetime(df["Datum"])
-    return df
+    from core.ingest import open_report
+
+    with stage("načtení"):
+        dataset = open_report(uploaded_files)
+    st.session_state["dataset"] = dataset
+    return dataset.df
 
 
 def app():
@@ -49,39 +37,24 @@ def app():
     if df is None:
         st.info("Nahraj soubor pro pokročilou pivot analýzu nebo se vrať na hlavní stránku.")
         return
+    set_rows(len(df))
+
+    # Moduly s pandas až s daty - výzva k nahrání je nepotřebuje
+    from core.export import download_buttons, flat_table
+    from core.filter_state import filter_panel, filtered_view
+    from core.pivot import AGGREGATIONS, PivotConfigError, PivotTooLarge, cached_pivot
 
     # 2) Filtry
     st.sidebar.header("Filtry (Pivot stránka)")
-    with st.sidebar.expander("Rozbalit filtry"):
-        datum_min = df["Datum"].min().date()
-        datum_max = df["Datum"].max().date()
-        datum_od = st.date_input("Od", datum_min)
-        datum_do = st.date_input("Do", datum_max)
-
-        linky = st.multiselect("Linky", df["Linie"].unique(), default=df["Linie"].unique())
-        fehler_kod_filtr = st.multiselect(
-            "Fehler kód", df["Fehler"].dropna().unique(), default=df["Fehler"].dropna().unique()
-        )
-        zarizeni_filtr = st.multiselect(
-            "Zařízení", df["Zarizeni"].dropna().unique(), default=df["Zarizeni"].dropna().unique()
-        )
-        storort_popis_filtr = st.multiselect(
-            "Storort Bezeichnung", df["Storort Popis"].dropna().unique(), default=df["Storort Popis"].dropna().unique()
-        )
-        fehler_popis_filtr = st.multiselect(
-            "Fehler Popis", df["Fehler Popis"].dropna().unique(), default=df["Fehler Popis"].dropna().unique()
-        )
-
-    # Aplikace filtrů
-    df_filtered = df[
-        (df["Datum"].dt.date >= datum_od) &
-        (df["Datum"].dt.date <= datum_do) &
-        (df["Linie"].isin(linky)) &
-        (df["Fehler"].isin(fehler_kod_filtr)) &
-        (df["Zarizeni"].isin(zarizeni_filtr)) &
-        (df["Storort Popis"].isin(storort_popis_filtr)) &
-        (df["Fehler Popis"].isin(fehler_popis_filtr))
-    ]
+    # Filtry jsou společné všem stránkám relace
+    with stage("nabídky filtrů"):
+        filtry, _ = filter_panel(df)
+
+    # Aplikace filtrů (stejné filtry na jiné stránce vrací hotový výsledek)
+    with stage("filtr"):
+        view = filtered_view(df, filtry)
+        df_filtered = view.df
+        signature = view.signature
 
     st.markdown("""
     ### Pokročilá pivotka
@@ -98,37 +71,41 @@ def app():
     )
 
     st.markdown("**Vyber metody agregace (můžeš zvolit více)**")
-    agg_choices = {"count": "count", "sum": "sum", "mean": "mean"}
-    selected_aggs = st.multiselect("Agregace", list(agg_choices.keys()), default=["count","sum"])
+    selected_aggs = st.multiselect("Agregace", AGGREGATIONS, default=["count","sum"])
 
-    agg_dict = {val_col: [agg_choices[a] for a in selected_aggs] for val_col in values_cols}
     add_margins = st.checkbox("Zobrazit součty (margins)", value=True)
 
-    # 4) Vytvoření pivot tabulky bez vestavěných margins
-    pivot_table_adv = pd.pivot_table(
-        df_filtered,
-        index=index_cols,
-        columns=columns_cols,
-        values=values_cols,
-        aggfunc=agg_dict,
-        fill_value=0,
-        margins=False
-    )
-
-    # 5) Ruční přidání řádkových součtů, pokud je zaškrtnuto
-    if add_margins:
-        row_totals = pivot_table_adv.sum(axis=1)
-        if isinstance(pivot_table_adv.index, pd.MultiIndex):
-            total_row_name = tuple(["Celkem"] * pivot_table_adv.index.nlevels)
-        else:
-            total_row_name = "Celkem"
-        pivot_table_adv.loc[total_row_name] = row_totals
+    # 4) Pivot jedním průchodem včetně součtů, zapamatovaný pro tento filtr
+    try:
+        with stage("pivot"):
+            pivot_table_adv = cached_pivot(
+                df, signature, df_filtered, index_cols, columns_cols, values_cols, selected_aggs, add_margins
+            )
+    except PivotTooLarge as e:
+        st.warning(str(e))
+        return
+    except PivotConfigError as e:
+        st.info(str(e))
+        return
 
     # Zobrazení výsledku
-    st.dataframe(pivot_table_adv, use_container_width=True)
+    with stage("zobrazení"):
+        st.dataframe(pivot_table_adv, width="stretch")
+
+    # 5) Stažení pivotu a vyfiltrovaných řádků
+    pivot_signature = (
+        signature, tuple(index_cols), tuple(columns_cols), tuple(values_cols), tuple(selected_aggs), add_margins
+    )
+    st.markdown("**Stáhnout pivot**")
+    download_buttons(
+        flat_table(pivot_table_adv), "pivot", "pivot", dataset=df, signature=pivot_signature, key="export_pivot"
+    )
+    st.markdown("**Stáhnout vyfiltrované řádky**")
+    download_buttons(df_filtered, "radky", "vyjezdy_filtr", dataset=df, signature=signature, key="export_radky")
 
 
 def run():
     app()
+    render_panel()
 
 run()
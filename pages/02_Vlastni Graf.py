@@ -1,41 +1,29 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+
+from core.instrument import begin_run, render_panel, set_rows, stage
 
 st.set_page_config(
     page_title="Pokročilá Pivot Analýza",
     page_icon=":bar_chart:",  # zvol si jakýkoli emoji
     layout="wide"
 )
+begin_run("Vlastní graf")
 
 def load_data():
     """
     Zkusíme načíst df z session_state nebo necháme uživatele nahrát soubor.
     """
-    if "df" in st.session_state:
-        return st.session_state["df"]
+    if "dataset" in st.session_state:
+        return st.session_state["dataset"].df
     else:
-        uploaded_file = st.file_uploader("Nahraj Excel pro vlastní grafy", type=["xlsx"])
-        if uploaded_file:
-            df_raw = pd.read_excel(uploaded_file, sheet_name=0, header=1)
-            df = df_raw.rename(columns={
-                df_raw.columns[1]: "Datum",
-                df_raw.columns[2]: "Linie",
-                df_raw.columns[3]: "PPlatz",
-                df_raw.columns[4]: "Storort",
-                df_raw.columns[5]: "Storort Popis",
-                df_raw.columns[6]: "Fab Nr",
-                df_raw.columns[7]: "Material Nr",
-                df_raw.columns[8]: "Zarizeni",
-                df_raw.columns[9]: "Material Nr 2",
-                df_raw.columns[10]: "Material Popis",
-                df_raw.columns[11]: "Fehler",
-                df_raw.columns[12]: "Fehler Popis",
-                df_raw.columns[13]: "Komentar"
-            })
-            df = df.dropna(subset=["Datum"])
-            df["Datum"] = pd.to_datetime(df["Datum"])
-            return df
+        uploaded_files = st.file_uploader("Nahraj Excel pro vlastní grafy", type=["xlsx"], accept_multiple_files=True)
+        if uploaded_files:
+            from core.ingest import open_report
+
+            with stage("načtení"):
+                dataset = open_report(uploaded_files)
+            st.session_state["dataset"] = dataset
+            return dataset.df
         else:
             return None
 
@@ -46,37 +34,26 @@ def app():
     if df is None:
         st.info("Nahraj soubor nebo použij data z hlavní stránky (uložená v session_state).")
         return
+    set_rows(len(df))
+
+    # Moduly s pandas až s daty - výzva k nahrání je nepotřebuje
+    from core.custom_chart import CHART_TYPES, LARGE_DATA_THRESHOLD, build_figure
+    from core.filter_state import filter_panel, filtered_view
 
     # 1) Filtry (stejné jako jinde)
     st.sidebar.header("Filtry (Vlastní graf)")
-    with st.sidebar.expander("Rozbalit filtry"):
-        datum_min = df["Datum"].min().date()
-        datum_max = df["Datum"].max().date()
-        datum_od = st.date_input("Od", datum_min)
-        datum_do = st.date_input("Do", datum_max)
-
-        linky = st.multiselect("Linky", df["Linie"].unique(), default=df["Linie"].unique())
-        fehler_kod_filtr = st.multiselect("Fehler kód", df["Fehler"].dropna().unique(), default=df["Fehler"].dropna().unique())
-        zarizeni_filtr = st.multiselect("Zařízení", df["Zarizeni"].dropna().unique(), default=df["Zarizeni"].dropna().unique())
-        storort_popis_filtr = st.multiselect("Storort Bezeichnung", df["Storort Popis"].dropna().unique(), default=df["Storort Popis"].dropna().unique())
-        fehler_popis_filtr = st.multiselect("Fehler Popis", df["Fehler Popis"].dropna().unique(), default=df["Fehler Popis"].dropna().unique())
-
-    # Aplikace filtrů
-    df_filtered = df[
-        (df["Datum"].dt.date >= datum_od) &
-        (df["Datum"].dt.date <= datum_do) &
-        (df["Linie"].isin(linky)) &
-        (df["Fehler"].isin(fehler_kod_filtr)) &
-        (df["Zarizeni"].isin(zarizeni_filtr)) &
-        (df["Storort Popis"].isin(storort_popis_filtr)) &
-        (df["Fehler Popis"].isin(fehler_popis_filtr))
-    ]
+    # Filtry jsou společné všem stránkám relace
+    with stage("nabídky filtrů"):
+        filtry, _ = filter_panel(df)
+
+    # Aplikace filtrů (stejné filtry na jiné stránce vrací hotový výsledek)
+    with stage("filtr"):
+        df_filtered = filtered_view(df, filtry).df
 
     st.subheader("Definuj si vlastní graf")
 
     # 2) Vyber si typ grafu
-    chart_types = ["Bar", "Line", "Scatter", "Histogram", "Box"]
-    selected_chart_type = st.selectbox("Typ grafu", chart_types)
+    selected_chart_type = st.selectbox("Typ grafu", CHART_TYPES)
 
     # 3) Vyber x a y
     all_cols = df_filtered.columns.tolist()
@@ -86,66 +63,26 @@ def app():
     # Možnost vybrat "color"
     color_col = st.selectbox("Rozlišení podle (color)", [None] + all_cols, index=0)
 
+    # Nad tímto počtem řádků se graf počítá agregovaně na serveru
+    threshold = st.sidebar.number_input(
+        "Limit řádků pro kreslení po bodech", min_value=1000, value=LARGE_DATA_THRESHOLD, step=5000
+    )
+
     # 4) Vytvoříme graf podle vybraného typu (s většími rozměry)
-    fig = None
-
-    if selected_chart_type == "Bar":
-        fig = px.bar(
-            df_filtered,
-            x=x_axis,
-            y=y_axis,
-            color=color_col if color_col else None,
-            title=f"{selected_chart_type} graf",
-            width=1200,
-            height=700
-        )
-    elif selected_chart_type == "Line":
-        fig = px.line(
-            df_filtered,
-            x=x_axis,
-            y=y_axis,
-            color=color_col if color_col else None,
-            title=f"{selected_chart_type} graf",
-            width=1200,
-            height=700
-        )
-    elif selected_chart_type == "Scatter":
-        fig = px.scatter(
-            df_filtered,
-            x=x_axis,
-            y=y_axis,
-            color=color_col if color_col else None,
-            title=f"{selected_chart_type} graf",
-            width=1200,
-            height=700
-        )
-    elif selected_chart_type == "Histogram":
-        fig = px.histogram(
-            df_filtered,
-            x=x_axis,
-            color=color_col if color_col else None,
-            title=f"{selected_chart_type} graf",
-            width=1200,
-            height=700
-        )
-    elif selected_chart_type == "Box":
-        fig = px.box(
-            df_filtered,
-            x=x_axis,
-            y=y_axis,
-            color=color_col if color_col else None,
-            title=f"{selected_chart_type} graf",
-            width=1200,
-            height=700
-        )
+    with stage("graf"):
+        fig, notice = build_figure(df_filtered, selected_chart_type, x_axis, y_axis, color_col, threshold)
 
     if fig is not None:
-        # Pozn.: use_container_width=False, aby se bral v potaz width=1200
-        st.plotly_chart(fig, use_container_width=False)
+        if notice:
+            st.info(f"Režim pro velká data: {notice}")
+        # Pozn.: width="content", aby se bral v potaz width=1200 z grafu
+        with stage("zobrazení"):
+            st.plotly_chart(fig, width="content")
     else:
-        st.info("Zvol typ grafu pro zobrazení.")
+        st.info(notice or "Zvol typ grafu pro zobrazení.")
 
 def run():
     app()
+    render_panel()
 
 run()
@@ -1,7 +1,6 @@
 import streamlit as st
-import pandas as pd
-import datetime
-import plotly.express as px  # import for plotting
+
+from core.instrument import begin_run, render_panel, set_rows, stage
 
 # Nastavení zobrazení stránky
 st.set_page_config(
@@ -9,17 +8,58 @@ st.set_page_config(
     page_icon=":bar_chart:",
     layout="wide"
 )
+begin_run("KPI")
 
 def load_data():
-    if "df" in st.session_state:
-        return st.session_state["df"]
+    if "dataset" in st.session_state:
+        return st.session_state["dataset"].df
     st.info("Nejprve nahrajte data na hlavní stránce.")
     return None
 
+def trend_figure(daily):
+    """Čárový graf počtu výjezdů po dnech."""
+    # plotly se načítá až při kreslení - úvodní obrazovka bez dat ho nepotřebuje
+    import plotly.express as px
+
+    return px.line(daily, x="Datum", y="Pocet", title="Počet výjezdů po dnech")
+
+def top_lines_figure(top5):
+    """Sloupcový graf linek s nejvíce výjezdy."""
+    import plotly.express as px
+
+    return px.bar(top5, x="Linie", y="Pocet", title="Top 5 linek")
+
+def rolling_figure(rolling_long, okno):
+    """Klouzavý průměr výjezdů na den po linkách."""
+    import plotly.express as px
+
+    return px.line(
+        rolling_long, x="Datum", y="Průměr na den", color="Linie",
+        title=f"Klouzavý {okno}denní průměr"
+    )
+
+def codes_figure(code_counts):
+    """Výsečový graf chyb podle kódu Fehler."""
+    import plotly.express as px
+
+    fig = px.pie(
+        code_counts,
+        names="Fehler kód",
+        values="Pocet",
+        title="Distribuce chyb podle kódu Fehler",
+        height=400
+    )
+    fig.update_traces(textinfo='value+percent', textposition='inside')
+    return fig
+
 # Načtení dat
 df = load_data()
 if df is None:
     st.stop()
+set_rows(len(df))
+
+# Denní index (pandas) až s daty - výzva k nahrání ho nepotřebuje
+from core.timeline import COMPARISONS, ROLLING_WINDOWS, comparison_period, get_daily_index  # noqa: E402
 
 st.title(":bar_chart: Klíčové ukazatele (KPI)")
 
@@ -32,31 +72,31 @@ with col1:
     datum_do = st.date_input("Období do", datum_max)
 with col2:
     st.markdown("_Vyberte období, pro které chcete zobrazit KPI._")
+    rezim_srovnani = st.selectbox("Srovnat s", list(COMPARISONS))
 
 # Kontrola rozsahu
 days = (datum_do - datum_od).days + 1
 n_days_text = f"({days} dní)" if days > 1 else "(1 den)"
 
-# Filtrování dat
-mask_cur = (df["Datum"].dt.date >= datum_od) & (df["Datum"].dt.date <= datum_do)
-df_cur = df[mask_cur]
+# Denní index s kumulativními součty - každé období je rozdíl dvou čísel
+with stage("denní index"):
+    daily_index = get_daily_index(df)
 
 # Výpočty základních KPI
-total_incidents = len(df_cur)
+total_incidents = daily_index.total(datum_od, datum_do)
 avg_per_day = total_incidents / days if days > 0 else 0
 
 # Incidents per line a top line
-line_counts = df_cur["Linie"].value_counts()
-top_line = line_counts.idxmax() if not line_counts.empty else None
-top_line_count = line_counts.max() if not line_counts.empty else 0
-avg_per_line = line_counts.mean() if not line_counts.empty else 0
-
-# Srovnání s předchozím obdobím
-prev_end = datum_od - datetime.timedelta(days=1)
-prev_start = prev_end - datetime.timedelta(days=days-1)
-mask_prev = (df["Datum"].dt.date >= prev_start) & (df["Datum"].dt.date <= prev_end)
-df_prev = df[mask_prev]
-prev_total = len(df_prev)
+with stage("počty linek"):
+    line_counts = daily_index.counts("Linie", datum_od, datum_do)
+top_line = line_counts["Linie"].iloc[0] if not line_counts.empty else None
+top_line_count = line_counts["Pocet"].iloc[0] if not line_counts.empty else 0
+avg_per_line = line_counts["Pocet"].mean() if not line_counts.empty else 0
+
+# Srovnání se zvoleným obdobím (předchozí období, WoW, MoM, YoY)
+prev_start, prev_end = comparison_period(datum_od, datum_do, rezim_srovnani)
+with stage("srovnání období"):
+    prev_total = daily_index.total(prev_start, prev_end)
 delta_total = total_incidents - prev_total
 
 delta_str = f"{delta_total:+d}"
@@ -73,30 +113,50 @@ col_a.metric("Celkový počet výjezdů", total_incidents, delta_str + delta_str
 col_b.metric("Průměr na den", f"{avg_per_day:.1f}")
 col_c.metric("Nejkritičtější linka", top_line or "-", f"{top_line_count}")
 col_d.metric("Průměr na linku", f"{avg_per_line:.1f}")
+st.caption(f"Srovnání ({rezim_srovnani}): {prev_start} až {prev_end}, {prev_total} výjezdů")
 
 # Graf trendu v čase
 st.subheader("Trend výjezdů v čase")
-df_cur_ts = df_cur.groupby(df_cur["Datum"].dt.date).size().reset_index(name="Pocet")
-fig_trend = px.line(df_cur_ts, x="Datum", y="Pocet", title="Počet výjezdů po dnech")
-st.plotly_chart(fig_trend, use_container_width=True)
+with stage("trend"):
+    df_cur_ts = daily_index.daily(datum_od, datum_do)
+    fig_trend = trend_figure(df_cur_ts)
+    st.plotly_chart(fig_trend, width="stretch")
 
 # Top 5 linek podle počtu výjezdů
 st.subheader("Top 5 linek podle počtu výjezdů")
-top5 = line_counts.head(5).reset_index()
-top5.columns = ["Linie", "Pocet"]
-fig_top5 = px.bar(top5, x="Linie", y="Pocet", title="Top 5 linek")
-st.plotly_chart(fig_top5, use_container_width=True)
+top5 = line_counts.head(5)
+fig_top5 = top_lines_figure(top5)
+st.plotly_chart(fig_top5, width="stretch")
+
+# Srovnání linek se zvoleným obdobím
+st.subheader(f"Linky: {rezim_srovnani}")
+with stage("srovnání linek"):
+    line_compare = daily_index.compare("Linie", datum_od, datum_do, prev_start, prev_end)
+st.dataframe(line_compare, width="stretch", hide_index=True)
+
+# Klouzavý průměr výjezdů na den po linkách
+st.subheader("Klouzavý průměr výjezdů na den")
+col_okno, col_linky = st.columns([1, 3])
+with col_okno:
+    okno = st.radio("Okno (dní)", ROLLING_WINDOWS, horizontal=True)
+with col_linky:
+    vybrane_linky = st.multiselect(
+        "Linky", list(line_counts["Linie"]), default=list(top5["Linie"])
+    )
+with stage("klouzavý průměr"):
+    rolling = daily_index.rolling(datum_od, datum_do, okno, "Linie", values=vybrane_linky)
+    rolling["Celkem"] = daily_index.rolling(datum_od, datum_do, okno)["Celkem"]
+rolling_long = rolling.rename_axis("Datum").reset_index().melt(
+    id_vars="Datum", var_name="Linie", value_name="Průměr na den"
+)
+fig_rolling = rolling_figure(rolling_long, okno)
+st.plotly_chart(fig_rolling, width="stretch")
 
 # Přehled podle Fehler kódu - výsečový graf
 st.subheader("Chyby podle kódu (Fehler)")
-code_counts = df_cur["Fehler"].value_counts().reset_index()
-code_counts.columns = ["Fehler kód", "Pocet"]
-fig_codes = px.pie(
-    code_counts,
-    names="Fehler kód",
-    values="Pocet",
-    title="Distribuce chyb podle kódu Fehler",
-    height=400
-)
-fig_codes.update_traces(textinfo='value+percent', textposition='inside')
-st.plotly_chart(fig_codes, use_container_width=True)
+with stage("kódy chyb"):
+    code_counts = daily_index.counts("Fehler", datum_od, datum_do, label="Fehler kód")
+fig_codes = codes_figure(code_counts)
+st.plotly_chart(fig_codes, width="stretch")
+
+render_panel()